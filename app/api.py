@@ -1,40 +1,115 @@
 import json
 from bottle import HTTPResponse
 
+#use the fastest json library that is installed
+try:
+    import orjson
+    loads = orjson.loads
+except ImportError:
+    try:
+        import ujson
+        loads = ujson.loads
+    except ImportError:
+        loads = json.loads
+
+JSON_HEADERS = {
+    "Content-Type": "application/json"
+}
+
+#the only four things /move can ever say, made once
+MOVE_BODIES = dict((move, json.dumps({"move": move}).encode())
+    for move in ['up', 'down', 'left', 'right'])
+MOVE_NAMES = dict((body, move) for move, body in MOVE_BODIES.items())
+
+START_BODIES = {}#color:body, made the first time a color is used
+
 def ping_response():
     return HTTPResponse(
         status=200
     )
 
 def start_response(color):
-    assert type(color) is str, \
-        "Color value must be string"
+    body = START_BODIES.get(color)
+    if body is None:
+        assert type(color) is str, \
+            "Color value must be string"
+        body = START_BODIES[color] = json.dumps({
+            "color": color
+        }).encode()
 
     return HTTPResponse(
         status=200,
-        headers={
-            "Content-Type": "application/json"
-        },
-        body=json.dumps({
-            "color": color
-        })
+        headers=JSON_HEADERS,
+        body=body
     )
 
 def move_response(move):
-    assert move in ['up', 'down', 'left', 'right'], \
+    body = MOVE_BODIES.get(move)
+    assert body is not None, \
         "Move must be one of [up, down, left, right]"
 
     return HTTPResponse(
         status=200,
-        headers={
-            "Content-Type": "application/json"
-        },
-        body=json.dumps({
-            "move": move
-        })
+        headers=JSON_HEADERS,
+        body=body
     )
 
 def end_response():
     return HTTPResponse(
         status=200
     )
+
+def metrics_response(text):
+    return HTTPResponse(
+        status=200,
+        headers={
+            "Content-Type": "text/plain; version=0.0.4"
+        },
+        body=text
+    )
+
+def read_json(request):
+    """decodes the whole body of a bottle request, {} if there isnt one"""
+    return decode_json(request.body.read())
+
+def decode_json(raw):
+    """decodes a request body, {} if it is empty"""
+    if not raw:
+        return {}
+    return loads(raw)
+
+def slim_snake(snake):
+    return {
+        "id": snake["id"],
+        "health": snake["health"],
+        "body": snake["body"]
+    }
+
+def read_move(request):
+    """decodes the body of a bottle /move request, see decode_move"""
+    return decode_move(request.body.read())
+
+def decode_move(raw):
+    """decodes a /move request body keeping only what the snake uses,
+    the result is laid out the same as the full request
+
+    Returns:
+        dict -- game id and timeout, turn, board size, food, snakes and you
+    """
+    data = decode_json(raw)
+    game = data.get("game") or {}
+    board = data["board"]
+    return {
+        "game": {
+            "id": game.get("id"),
+            "timeout": game.get("timeout")
+        },
+        "turn": data.get("turn", 0),
+        "board": {
+            "width": board["width"],
+            "height": board["height"],
+            "food": board["food"],
+            "snakes": [slim_snake(snake) for snake in board["snakes"]]
+        },
+        "you": slim_snake(data["you"])
+    }
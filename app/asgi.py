@@ -0,0 +1,110 @@
+"""
+asyncio entry point serving the same routes as main.py.
+
+Working out a move is pure python and can take a while. Threads all
+share the GIL, so the expensive part (decideMove) goes to the worker
+processes in pool.py, which are always started here whatever MOVE_POOL
+says. A slow stallForTime then only holds up one process and moves for
+other games carry on on the other cores. Each move waits for its
+process on a thread of its own, there are MOVE_WORKERS of them and they
+only build the board, so a cheap move isnt stuck in a queue behind slow
+ones. Once more moves need a process than there are POOL_WORKERS they
+do queue, and a move still waiting at its deadline gets the safe move.
+Until every worker has loaded, moves are worked out on the threads.
+
+Run it with any ASGI server, for example:
+    uvicorn --app-dir app asgi:application
+"""
+import asyncio
+import mimetypes
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from api import decode_json, decode_move, ping_response
+from pool import startPool, stopPool
+import main
+
+MOVE_WORKERS = int(os.getenv('MOVE_WORKERS', 32))#moves waiting on the workers at once
+STATIC_ROOT = os.path.abspath('static')
+
+EXECUTOR = ThreadPoolExecutor(max_workers=MOVE_WORKERS)
+
+async def readBody(receive):
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            return body
+
+async def respond(send, status, body=b"", contentType=None):
+    headers = []
+    if contentType is not None:
+        headers.append((b"content-type", contentType.encode()))
+    headers.append((b"content-length", str(len(body)).encode()))
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+async def respondWith(send, response):
+    """sends a bottle HTTPResponse made by the api.py helpers"""
+    body = response.body
+    if isinstance(body, str):
+        body = body.encode()
+    await respond(send, response.status_code, body, response.headers.get("Content-Type"))
+
+def staticFile(path):
+    """reads a file from the static folder, None if it isnt there"""
+    fullPath = os.path.abspath(os.path.join(STATIC_ROOT, path))
+    if not fullPath.startswith(STATIC_ROOT + os.sep) or not os.path.isfile(fullPath):
+        return None
+    with open(fullPath, "rb") as f:
+        return f.read()
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            startPool()#loads in the background, see poolReady()
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            EXECUTOR.shutdown(wait=False)
+            stopPool()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+async def application(scope, receive, send):
+    if scope["type"] == "lifespan":
+        return await lifespan(receive, send)
+    if scope["type"] != "http":
+        return
+
+    started = time.perf_counter()#move budget counts from when the request came in
+    path = scope["path"]
+    method = scope["method"]
+    body = await readBody(receive)
+    loop = asyncio.get_running_loop()
+
+    if method == "POST" and path == "/move":
+        data = decode_move(body)
+        response = await loop.run_in_executor(EXECUTOR, main.playMove, data, started)
+        await respondWith(send, response)
+    elif method == "POST" and path == "/start":
+        await respondWith(send, main.startGame(decode_json(body)))
+    elif method == "POST" and path == "/end":
+        await respondWith(send, main.endGame(decode_json(body)))
+    elif method == "POST" and path == "/ping":
+        await respondWith(send, ping_response())
+    elif method == "GET" and path == "/metrics":
+        await respondWith(send, main.metrics())
+    elif method == "GET" and path.startswith("/static/"):
+        content = await loop.run_in_executor(None, staticFile, path[len("/static/"):])
+        if content is None:
+            await respond(send, 404)
+        else:
+            contentType = mimetypes.guess_type(path)[0] or "application/octet-stream"
+            await respond(send, 200, content, contentType)
+    elif method == "GET" and path == "/":
+        await respond(send, 200, main.index().encode(), "text/html; charset=UTF-8")
+    else:
+        await respond(send, 404)
@@ -0,0 +1,82 @@
+"""
+bitboards, a set of cells kept as one python int with bit i set for
+cell i (so bit y*width+x for square x,y). a flood fill on them moves a
+whole frontier one step with four shifts and a few ands, so how much
+of the board can be reached costs one loop per step out instead of one
+per square. the column masks it needs come from the boards topology.
+"""
+from board import FOOD, SELF
+
+#bytes.translate tables that turn cells into "1" and "0" characters
+OPEN_BITS = bytes(ord("1") if identity < SELF else ord("0") for identity in range(256))
+FOOD_BITS = bytes(ord("1") if identity == FOOD else ord("0") for identity in range(256))
+
+def popcount(bits):
+    """how many bits are set"""
+    return bin(bits).count("1")
+
+if hasattr(int, "bit_count"):
+    popcount = int.bit_count
+
+def toBits(cells, table):
+    """turns cells into a bitboard
+
+    Arguments:\n
+        cells {bytearray} -- board.cells
+        table {bytes} -- OPEN_BITS, FOOD_BITS or the like
+
+    Returns:
+        int -- the bitboard
+    """
+    return int(cells.translate(table)[::-1], 2)#last cell is the highest bit
+
+def openBits(board):
+    """the cells that can be travelled through"""
+    return toBits(board.cells, OPEN_BITS)
+
+def foodBits(board):
+    """the cells with food on them"""
+    return toBits(board.cells, FOOD_BITS)
+
+def spread(bits, topology):
+    """bits along with every cell next to one of them"""
+    width = topology.width
+    return (bits | ((bits << 1) & topology.notFirstColumn) | ((bits >> 1) & topology.notLastColumn)
+        | (bits << width) | (bits >> width))
+
+def flood(board, start, passable=None, targets=0):
+    """every cell that can be reached from start
+
+    Arguments:\n
+        board {Board} -- the board
+        start {int} -- the cell to start at, counts as reached even if it
+            cant be travelled through
+
+    Keyword Arguments:\n
+        passable {int} -- bitboard of cells that can be travelled through,
+            openBits(board) if None (default: {None})
+        targets {int} -- bitboard, stops as soon as any of them are
+            reached (default: {0})
+
+    Returns:
+        int -- bitboard of the cells reached
+    """
+    topology = board.topology
+    if passable is None:
+        passable = openBits(board)
+    reached = 1 << start
+    passable |= reached
+    while not reached & targets:
+        grown = spread(reached, topology) & passable
+        if grown == reached:
+            break
+        reached = grown
+    return reached
+
+def area(board, start, passable=None):
+    """how many cells can be reached from start, start included"""
+    return popcount(flood(board, start, passable))
+
+def canReach(board, start, targets, passable=None):
+    """true if any cell in the targets bitboard can be reached from start"""
+    return bool(flood(board, start, passable, targets) & targets)
@@ -0,0 +1,245 @@
+from array import array
+
+from topology import topology
+from zobrist import zobristKeys
+
+"""
+0 = empty space
+1 = food
+2 = enemy head
+3 = my head
+4 = my snaky body
+5 = other snake bodies
+"""
+SPACE = 0
+FOOD = 1
+HEAD = 2
+MYHEAD = 3
+SELF = 4
+BODY = 5
+
+def boardContents(data):
+    """finds what is on every square that isnt empty
+
+    Arguments:\n
+        data {dict} -- the game information
+
+    Returns:
+        dict -- cell index:identity, for details of values see top of file
+    """
+    board = data["board"]
+    width = board["width"]
+    contents = {}
+
+    #food
+    for meal in board["food"]:
+        contents[meal["y"]*width + meal["x"]] = FOOD
+
+    #snakes
+    myId = data["you"]["id"]
+    for snake in board["snakes"]:
+        isSelf = snake["id"] == myId
+        head = snake["body"][0]
+        contents[head["y"]*width + head["x"]] = MYHEAD if isSelf else HEAD
+
+        if data["turn"] == 0: #there will be no other bodies
+            continue
+
+        bodyId = SELF if isSelf else BODY
+        for part in snake["body"][1:-1]:#-1 so doesnt count tail
+            contents[part["y"]*width + part["x"]] = bodyId
+    return contents
+
+def vacateTimes(data):
+    """works out how many turns from now every body square boardContents
+    marks will be empty, assuming nobody eats. segment k of a snake of
+    length L (the head is 0) is gone after L-k moves, so a square can be
+    moved into on that turn since the tail moves off as the head moves on.
+    a snake that just ate has its tail doubled up, the later time is kept
+
+    Arguments:\n
+        data {dict} -- the game information
+
+    Returns:
+        dict -- cell index:turn it is free on
+    """
+    times = {}
+    if data["turn"] == 0:#every snake is still coiled up on one square
+        return times
+    width = data["board"]["width"]
+    for snake in data["board"]["snakes"]:
+        body = snake["body"]
+        length = len(body)
+        for k in range(1, length-1):#same segments as boardContents
+            part = body[k]
+            i = part["y"]*width + part["x"]
+            if times.get(i, 0) < length-k:
+                times[i] = length-k
+    return times
+
+class Board(object):
+    """the board as flat buffers, cell (x, y) lives at index y*width+x
+
+    cells holds the identity of every square (see top of file),
+    anything below SELF can be travelled through.
+    weights holds how costly it is to travel into every square.
+    free holds the turn every body square empties out on (see
+    vacateTimes), 0 for everything else, so a body square with 0 is
+    there for good. vacating lists the same squares as (turn, cell)
+    soonest first. DistanceField and makeDijk let the snake into a body
+    square if it is free by the time it gets there.
+    topology and neighbours are the tables for boards this size (see
+    topology.py), shared by every board that size so never changed.
+    changes made with change() are logged in history so they
+    can be taken back with rollback().
+    hash is the zobrist hash of cells once zobrist() has been asked for,
+    change() and rollback() keep it up to date, anything that writes to
+    cells directly has to set it back to None.
+    """
+    __slots__ = ("width", "height", "size", "cells", "weights", "free", "vacating",
+        "topology", "neighbours", "history", "hash", "keys")
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.size = width*height
+        self.cells = bytearray(self.size)
+        self.weights = array("i", [1])*self.size
+        self.free = array("i", [0])*self.size
+        self.vacating = []
+        self.topology = topology(width, height)
+        self.neighbours = self.topology.neighbours
+        self.history = []
+        self.hash = None
+        self.keys = None
+
+    def clearWeights(self):
+        """sets every weight back to 1"""
+        self.weights = array("i", [1])*self.size
+
+    def copy(self):
+        """copies the board, the topology is shared
+
+        Returns:
+            Board -- a board that can be changed without affecting this one
+        """
+        nuBoard = Board.__new__(Board)
+        nuBoard.width = self.width
+        nuBoard.height = self.height
+        nuBoard.size = self.size
+        nuBoard.cells = bytearray(self.cells)
+        nuBoard.weights = array("i", self.weights)
+        nuBoard.free = array("i", self.free)
+        nuBoard.vacating = self.vacating#replaced, never changed, so can be shared
+        nuBoard.topology = self.topology
+        nuBoard.neighbours = self.neighbours
+        nuBoard.history = []
+        nuBoard.hash = self.hash
+        nuBoard.keys = self.keys
+        return nuBoard
+
+    def setFree(self, times):
+        """sets when the body squares empty out, what was set before is cleared
+
+        Arguments:\n
+            times {dict} -- cell index:turn, from vacateTimes()
+        """
+        free = self.free
+        for _, i in self.vacating:
+            free[i] = 0
+        for i, turn in times.items():
+            free[i] = turn
+        self.vacating = sorted((turn, i) for i, turn in times.items())
+
+    def index(self, pos):
+        """turns x,y coordinates into a cell index
+
+        Arguments:\n
+            pos {tuple} -- x,y coordinates of the square
+
+        Returns:
+            int -- the index, or None if the square is off the board
+        """
+        x, y = pos
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return y*self.width + x
+        return None
+
+    def pos(self, i):
+        """turns a cell index into x,y coordinates"""
+        return (i % self.width, i // self.width)
+
+    def isOpen(self, i):
+        """true if the snake can travel through cell i"""
+        return self.cells[i] < SELF
+
+    def adj(self, i):
+        """the cells next to cell i that can be travelled through
+
+        Arguments:\n
+            i {int} -- the cell index
+
+        Returns:
+            list of ints -- the indices of the open adjacent cells
+        """
+        cells = self.cells
+        return [n for n in self.neighbours[i] if cells[n] < SELF]
+
+    def change(self, i, identity, weight=None):
+        """changes a cell in a way that can be undone
+
+        Arguments:\n
+            i {int} -- the cell index
+            identity {int} -- what will be there now
+
+        Keyword Arguments:\n
+            weight {int} -- the new weight, left alone if None (default: {None})
+        """
+        old = self.cells[i]
+        self.history.append((i, old, self.weights[i]))
+        if self.hash is not None:
+            self.hash ^= self.keys[i*6+old] ^ self.keys[i*6+identity]
+        self.cells[i] = identity
+        if weight is not None:
+            self.weights[i] = weight
+
+    def checkpoint(self):
+        """marks the current state so it can be returned to
+
+        Returns:
+            int -- the mark, to be given to rollback()
+        """
+        return len(self.history)
+
+    def rollback(self, checkpoint):
+        """undoes every change made since a checkpoint
+
+        Arguments:\n
+            checkpoint {int} -- what checkpoint() gave back
+        """
+        history = self.history
+        cells = self.cells
+        weights = self.weights
+        keys = self.keys
+        while len(history) > checkpoint:
+            i, identity, weight = history.pop()
+            if self.hash is not None:
+                self.hash ^= keys[i*6+cells[i]] ^ keys[i*6+identity]
+            cells[i] = identity
+            weights[i] = weight
+
+    def zobrist(self):
+        """the zobrist hash of what is on every square, weights arent
+        included. worked out the first time then kept up to date
+
+        Returns:
+            int -- the hash
+        """
+        if self.hash is None:
+            keys = self.keys = zobristKeys(self.width, self.height).cells
+            value = 0
+            for i, identity in enumerate(self.cells):
+                if identity:
+                    value ^= keys[i*6+identity]
+            self.hash = value
+        return self.hash
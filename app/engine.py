@@ -0,0 +1,210 @@
+import random
+import time
+
+from bitboard import area, canReach, foodBits, openBits, toBits
+from board import HEAD
+from metrics import Metrics
+from search import DistanceField, aStar
+
+#bytes.translate table for the enemy heads bitboard
+HEAD_BITS = bytes(ord("1") if identity == HEAD else ord("0") for identity in range(256))
+
+class OutOfTime(Exception):
+    """raised between stages of a move once its deadline has passed"""
+
+def moveSeed(data):
+    """the seed for a moves random numbers, the same every time a turn
+    is replayed no matter which process or thread works it out
+    """
+    return "%s-%s" % (data.get("game", {}).get("id"), data.get("turn"))
+
+class Engine(object):
+    """everything that changes while one move is being worked out.
+
+    the searches take what they need from here instead of from module
+    level, so any number of moves can be worked out at once in threads or
+    worker processes without getting in each others way. each engine has
+    its own board (checked out of GAMES so no other request has it), its
+    own random numbers and its own counters, which are added to the
+    servers METRICS once the move is done.
+
+    what the branches of decideMove want to know about the turn, like the
+    distance field or how much room there is, is only worked out when a
+    branch first asks for it and is then kept in facts for the rest of
+    the move, see fact(). nothing is worked out for a branch not taken.
+    """
+    __slots__ = ("board", "data", "currPos", "facts", "deadline", "size",
+        "rng", "metrics", "executor", "table", "routes", "hierarchy")
+
+    def __init__(self, data, board=None, field=None, deadline=None, seed=None,
+            executor=None, table=None, routes=None, hierarchy=None):
+        """
+        Arguments:\n
+            data {dict} -- the game data
+
+        Keyword Arguments:\n
+            board {Board} -- the board for this turn (default: {None})
+            field {DistanceField} -- distances from the head, made when
+                first needed if None (default: {None})
+            deadline {float} -- time.perf_counter() value to be done by (default: {None})
+            seed {str} -- seeds the random numbers, moveSeed(data) if None
+            executor {Executor} -- shared by every move to spread independent
+                pieces of work out, they are done one by one if None
+            table {TranspositionTable} -- the games search results, kept
+                between turns (default: {None})
+            routes {FoodRoutes} -- the games food routes, kept between
+                turns, makeDijk is run instead if None (default: {None})
+            hierarchy {Hierarchy} -- the games clusters for long paths on
+                big boards (default: {None})
+        """
+        head = data["you"]["body"][0]
+        self.data = data
+        self.board = board
+        self.currPos = (head["x"], head["y"])
+        self.facts = {}
+        if field is not None:
+            self.facts["field"] = field
+        self.deadline = deadline
+        self.size = "%dx%d" % (data["board"]["width"], data["board"]["height"])
+        self.rng = random.Random(moveSeed(data) if seed is None else seed)
+        self.metrics = Metrics()
+        self.executor = executor
+        self.table = table
+        self.routes = routes
+        self.hierarchy = hierarchy
+
+    def outOfTime(self):
+        """true if there is a deadline and it has passed"""
+        return self.deadline is not None and time.perf_counter() >= self.deadline
+
+    def checkTime(self):
+        """raises OutOfTime if the deadline has passed"""
+        if self.outOfTime():
+            raise OutOfTime()
+
+    def timed(self, stage, started):
+        """records how long a stage took
+
+        Arguments:\n
+            stage {str} -- the name of the stage
+            started {float} -- time.perf_counter() when the stage started
+
+        Returns:
+            float -- time.perf_counter() now, when the next stage starts
+        """
+        now = time.perf_counter()
+        self.metrics.observe(stage, self.size, now-started)
+        return now
+
+    def nodes(self, search, count):
+        """records how many squares a search looked at"""
+        self.metrics.nodes(search, self.size, count)
+
+    def lookups(self, table, hits, misses):
+        """records how often a transposition table already had the answer"""
+        self.metrics.lookups(table, hits, misses)
+
+    def branch(self, name):
+        """records which part of the decision picked the move"""
+        self.metrics.branch(name)
+
+    def fact(self, name, make):
+        """something about this turn, make(engine) works it out the first
+        time it is asked for and after that it is kept
+
+        Arguments:\n
+            name {str} -- what it is called in facts
+            make {function} -- works it out from the engine
+
+        Returns:
+            whatever make gave back
+        """
+        facts = self.facts
+        if name not in facts:
+            facts[name] = make(self)
+        return facts[name]
+
+    @property
+    def field(self):
+        """breadth first distances from the head, see DistanceField"""
+        return self.fact("field", makeField)
+
+    def area(self):
+        """how many squares can be reached from the head, head included"""
+        return self.fact("area", lambda engine: area(engine.board, engine.head()))
+
+    def head(self):
+        return self.board.index(self.currPos)
+
+    def foodInReach(self):
+        """false if no food can be reached from the head, checked on
+        bitboards counting every body square that ever empties out as open,
+        so true only means a search might find a path
+        """
+        def make(engine):
+            board = engine.board
+            return canReach(board, engine.head(), foodBits(board), openBits(board) | freeBits(board))
+        return self.fact("foodInReach", make)
+
+    def enemyReachable(self):
+        """true if any enemy head can be reached from the head, only the
+        bitboards are looked at if that rules it out, otherwise the field
+        """
+        def make(engine):
+            board = engine.board
+            if len(engine.data["board"]["snakes"]) < 2:
+                return False
+            if "field" not in engine.facts:
+                heads = toBits(board.cells, HEAD_BITS)
+                if not canReach(board, engine.head(), heads, openBits(board) | freeBits(board)):
+                    return False
+            return engine.field.firstOf.get(HEAD) is not None
+        return self.fact("enemyReachable", make)
+
+    def tailPath(self):
+        """shortest path from the head to our tail, -1 if there isnt one"""
+        def make(engine):
+            board = engine.board
+            tail = engine.data["you"]["body"][-1]
+            return engine.pathTo(board.index((tail["x"], tail["y"])))
+        return self.fact("tailPath", make)
+
+    def pathTo(self, goal):
+        """shortest path from the head to a cell with aStar, or through
+        the games clusters if it has them and the cell is further than one
+        cluster away (see hierarchy.py)
+
+        Returns:
+            list of tuples or int -- x,y coordinates from the head, -1 if
+                there isnt a path
+        """
+        board = self.board
+        head = self.head()
+        hierarchy = self.hierarchy
+        if hierarchy is not None and board.topology.distance(head, goal) > hierarchy.clusterSize:
+            stats = hierarchy.stats
+            expanded = stats["expanded"]
+            hierarchy.update(board)
+            path = hierarchy.path(board, head, goal)
+            self.nodes("hierarchy", stats["expanded"]-expanded)
+            return path
+        stats = {}
+        path = aStar(board, head, goal, stats)
+        self.nodes("aStar", stats["expanded"])
+        return path
+
+def makeField(engine):
+    started = time.perf_counter()
+    field = DistanceField(engine.board, engine.currPos)
+    engine.timed("distanceField", started)
+    engine.nodes("distanceField", field.found)
+    return field
+
+def freeBits(board):
+    """bitboard of the body squares that empty out at some point, a path
+    through them might reach something the open squares alone dont
+    """
+    bits = 0
+    for _, i in board.vacating:
+        bits |= 1 << i
+    return bits
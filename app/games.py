@@ -0,0 +1,158 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from board import Board, boardContents, vacateTimes, SPACE
+from hierarchy import HIERARCHY_MIN_CELLS, Hierarchy
+from routes import INCREMENTAL, FoodRoutes
+from zobrist import TranspositionTable
+
+#games that never send /end are dropped once there are too many or they go quiet
+MAX_GAMES = int(os.getenv('MAX_GAMES', 64))
+GAME_TTL = float(os.getenv('GAME_TTL', 600))#seconds
+
+class GameState(object):
+    """what is remembered about a game from one turn to the next,
+    the board is kept and only the squares that changed get rewritten.
+    table keeps search results between turns, routes the food routes
+    if FOOD_ROUTES=incremental and hierarchy the clusters for long paths
+    on big boards (see hierarchy.py)
+    """
+    __slots__ = ("id", "board", "contents", "turn", "seen", "table", "routes",
+        "hierarchy")
+
+    def __init__(self, gameId, width, height):
+        self.id = gameId
+        self.board = Board(width, height)
+        self.contents = {}#cell index:identity of every square that isnt empty
+        self.turn = None
+        self.seen = time.monotonic()
+        self.table = TranspositionTable()
+        self.routes = FoodRoutes() if INCREMENTAL else None
+        self.hierarchy = newHierarchy(width, height)
+
+    def update(self, data):
+        """brings the board up to date with a new turn
+
+        Arguments:\n
+            data {dict} -- the game information
+
+        Returns:
+            Board -- the board for this turn, weights all back to 1
+        """
+        width = data["board"]["width"]
+        height = data["board"]["height"]
+        board = self.board
+        if board.width != width or board.height != height:
+            board = self.board = Board(width, height)
+            self.contents = {}
+            self.hierarchy = newHierarchy(width, height)
+
+        cells = board.cells
+        old = self.contents
+        contents = boardContents(data)
+        for i in old:
+            if i not in contents:#tail moved off or food eaten
+                cells[i] = SPACE
+        for i, identity in contents.items():
+            if old.get(i) != identity:
+                cells[i] = identity
+        self.contents = contents
+        board.setFree(vacateTimes(data))
+
+        board.clearWeights()
+        board.hash = None
+        del board.history[:]
+        self.table.newGeneration()
+        self.turn = data["turn"]
+        return board
+
+class GameCache(object):
+    """GameStates by game id, least recently used ones are dropped first
+
+    a state is taken out while a move uses it and put back after, so two
+    requests for the same game never share a board. safe to use from
+    more than one thread.
+    """
+    def __init__(self, maxGames=MAX_GAMES, ttl=GAME_TTL):
+        self.maxGames = maxGames
+        self.ttl = ttl
+        self.games = OrderedDict()
+        self.lock = threading.Lock()
+
+    def start(self, data):
+        """makes a fresh state for a game that is starting, which builds
+        the topology tables for its board size before the first move,
+        nothing is kept if the request doesnt say which game or board
+
+        Returns:
+            GameState -- the new state, None if nothing was kept
+        """
+        if not data.get("board") or gameId(data) is None:
+            return None
+        state = newState(data)
+        self.checkin(state)
+        return state
+
+    def checkout(self, data):
+        """takes the state for a game, a new one if it isnt known
+
+        Arguments:\n
+            data {dict} -- the game information
+
+        Returns:
+            GameState -- to be given back with checkin() when done
+        """
+        with self.lock:
+            state = self.games.pop(gameId(data), None)
+        if state is None or time.monotonic() - state.seen > self.ttl:
+            state = newState(data)
+        return state
+
+    def checkin(self, state):
+        """puts a state back once a move is done with it"""
+        if state.id is None:
+            return
+        state.seen = time.monotonic()
+        with self.lock:
+            self.games[state.id] = state
+            self.games.move_to_end(state.id)
+            self._prune(state.seen)
+
+    def end(self, data):
+        """forgets a game that is over"""
+        with self.lock:
+            self.games.pop(gameId(data), None)
+
+    def prune(self, now=None):
+        """drops games that went quiet and the oldest ones past maxGames"""
+        if now is None:
+            now = time.monotonic()
+        with self.lock:
+            self._prune(now)
+
+    def _prune(self, now):
+        games = self.games
+        while len(games) > self.maxGames:
+            games.popitem(last=False)
+        while games:
+            oldest = next(iter(games.values()))
+            if now - oldest.seen <= self.ttl:
+                break
+            games.popitem(last=False)
+
+    def __len__(self):
+        return len(self.games)
+
+def newHierarchy(width, height):
+    """clusters for a board big enough to need them, else None"""
+    if not HIERARCHY_MIN_CELLS or width*height < HIERARCHY_MIN_CELLS:
+        return None
+    return Hierarchy(width, height)
+
+def gameId(data):
+    return data.get("game", {}).get("id")
+
+def newState(data):
+    return GameState(gameId(data), data["board"]["width"], data["board"]["height"])
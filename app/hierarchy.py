@@ -0,0 +1,291 @@
+"""
+hierarchical paths for big boards, in the style of HPA*.
+
+the board is cut into square clusters CLUSTER_SIZE across. wherever a
+run of open squares lines up on both sides of the edge between two
+clusters, the middle pair of the run is an entrance. the abstract graph
+has an edge between the two squares of every entrance and an edge
+between every two entrances of a cluster that can reach each other
+inside it, costing how many moves that takes. a long path is found on
+that graph, which only has a few nodes per cluster, then filled in
+with searches that never leave one cluster.
+
+only which squares are open matters here, weights and when bodies empty
+out (see board.py) dont, so paths never go through a body. since they
+go through the entrances they come out a few percent longer than the
+shortest on average. update() only redoes the clusters that had a
+square open up or close since the last time.
+
+with HIERARCHY_MIN_CELLS set, games on boards with at least that many
+squares keep one in their GameState and use it for the path to our
+tail when it is further than a cluster away. it is off by default:
+aStar with the manhattan distance already goes nearly straight across
+open boards, so the clusters only pay for themselves on big cluttered
+ones (see bench/scaling.py).
+"""
+import heapq
+import os
+
+from board import SELF
+
+CLUSTER_SIZE = int(os.getenv('CLUSTER_SIZE', 10))
+HIERARCHY_MIN_CELLS = int(os.getenv('HIERARCHY_MIN_CELLS', 0))#0 is off
+
+#bytes.translate table, 1 for squares that can be gone through
+PASSABLE = bytes(1 if identity < SELF else 0 for identity in range(256))
+
+class Hierarchy(object):
+    """the clusters and abstract graph for one board
+
+    transitions -- (cluster, cluster to the right or below):list of
+        entrance (cell, cell) pairs along their edge
+    partners -- entrance cell:set of the cells it is paired with
+    intra -- cluster:{entrance:{other entrance:moves}}
+    """
+    __slots__ = ("width", "height", "clusterSize", "columns", "rows", "passable",
+        "transitions", "partners", "intra", "stats")
+
+    def __init__(self, width, height, clusterSize=CLUSTER_SIZE):
+        self.width = width
+        self.height = height
+        self.clusterSize = clusterSize
+        self.columns = (width+clusterSize-1)//clusterSize
+        self.rows = (height+clusterSize-1)//clusterSize
+        self.passable = None
+        self.transitions = {}
+        self.partners = {}
+        self.intra = {}
+        self.stats = {"rebuilt": 0, "expanded": 0}
+
+    def cluster(self, i):
+        size = self.clusterSize
+        return (i % self.width)//size + (i // self.width)//size*self.columns
+
+    def bounds(self, cluster):
+        """x0, y0, x1, y1 of a cluster, the 1s are one past the end"""
+        size = self.clusterSize
+        x0 = cluster % self.columns * size
+        y0 = cluster // self.columns * size
+        return x0, y0, min(x0+size, self.width), min(y0+size, self.height)
+
+    def update(self, board):
+        """brings the graph up to date with the board, only the clusters
+        with a square that opened up or closed are redone
+
+        Returns:
+            int -- how many clusters were redone
+        """
+        passable = board.cells.translate(PASSABLE)
+        old = self.passable
+        self.passable = passable
+        if old is None:
+            dirty = set(range(self.columns*self.rows))
+        else:
+            dirty = set()
+            width = self.width
+            size = self.clusterSize
+            for y in range(self.height):
+                row = y*width
+                for x0 in range(0, width, size):
+                    a = row + x0
+                    b = row + min(x0+size, width)
+                    if passable[a:b] != old[a:b]:
+                        dirty.add(self.cluster(a))
+        if not dirty:
+            return 0
+
+        redo = set(dirty)
+        for border in self._borders(dirty):
+            if self._setTransitions(border):#entrances moved so both sides need redoing
+                redo.update(border)
+        for cluster in redo:
+            self._linkCluster(cluster)
+        self.stats["rebuilt"] += len(redo)
+        return len(redo)
+
+    def _borders(self, clusters):
+        """every border any of the clusters is on, as (left or top, right or bottom)"""
+        columns = self.columns
+        borders = set()
+        for cluster in clusters:
+            cx = cluster % columns
+            cy = cluster // columns
+            if cx > 0:
+                borders.add((cluster-1, cluster))
+            if cx < columns-1:
+                borders.add((cluster, cluster+1))
+            if cy > 0:
+                borders.add((cluster-columns, cluster))
+            if cy < self.rows-1:
+                borders.add((cluster, cluster+columns))
+        return borders
+
+    def _setTransitions(self, border):
+        """works out the entrances along one border
+
+        Returns:
+            boolean -- true if they changed
+        """
+        first, second = border
+        width = self.width
+        passable = self.passable
+        x0, y0, x1, y1 = self.bounds(first)
+        if second == first+1:#side by side, the edge runs down
+            pairs = [(y*width + x1-1, y*width + x1) for y in range(y0, y1)]
+        else:#one above the other, the edge runs across
+            pairs = [((y1-1)*width + x, y1*width + x) for x in range(x0, x1)]
+
+        found = []
+        run = []
+        for a, b in pairs + [(None, None)]:
+            if a is not None and passable[a] and passable[b]:
+                run.append((a, b))
+            elif run:
+                found.append(run[len(run)//2])
+                run = []
+
+        old = self.transitions.get(border, [])
+        if found == old:
+            return False
+        partners = self.partners
+        for a, b in old:
+            for i, j in ((a, b), (b, a)):
+                partners[i].discard(j)
+                if not partners[i]:
+                    del partners[i]
+        for a, b in found:
+            partners.setdefault(a, set()).add(b)
+            partners.setdefault(b, set()).add(a)
+        if found:
+            self.transitions[border] = found
+        else:
+            del self.transitions[border]
+        return True
+
+    def entrances(self, cluster):
+        """the entrance cells of a cluster"""
+        cells = set()
+        for border in self._borders((cluster,)):
+            for a, b in self.transitions.get(border, ()):
+                cells.add(a if self.cluster(a) == cluster else b)
+        return sorted(cells)
+
+    def _linkCluster(self, cluster):
+        entrances = self.entrances(cluster)
+        links = {}
+        for entrance in entrances:
+            dist, _ = self.inside(entrance, cluster)
+            links[entrance] = dict((other, dist[other]) for other in entrances
+                if other != entrance and other in dist)
+        self.intra[cluster] = links
+
+    def inside(self, start, cluster, goal=None):
+        """breadth first search from start that doesnt leave the cluster
+
+        Keyword Arguments:\n
+            goal {int} -- stops once this is found (default: {None})
+
+        Returns:
+            tuple -- ({cell:moves}, {cell:cell it was reached from})
+        """
+        width = self.width
+        passable = self.passable
+        x0, y0, x1, y1 = self.bounds(cluster)
+        dist = {start:0}
+        parents = {}
+        frontier = [start]
+        while frontier and goal not in dist:
+            nextFrontier = []
+            for i in frontier:
+                x = i % width
+                y = i // width
+                nextDist = dist[i]+1
+                for adj, inBounds in ((i-1, x > x0), (i-width, y > y0),
+                        (i+1, x < x1-1), (i+width, y < y1-1)):
+                    if inBounds and adj not in dist and passable[adj]:
+                        dist[adj] = nextDist
+                        parents[adj] = i
+                        nextFrontier.append(adj)
+            frontier = nextFrontier
+        self.stats["expanded"] += len(dist)
+        return dist, parents
+
+    def path(self, board, start, goal):
+        """a short path between two squares, through the entrances
+
+        Arguments:\n
+            board {Board} -- the board, update() needs to have been given it
+            start {int} -- the cell to start at
+            goal {int} -- the cell to get to
+
+        Returns:
+            list of tuples or int -- x,y coordinates from start to goal,
+                -1 if there isnt one
+        """
+        startCluster = self.cluster(start)
+        goalCluster = self.cluster(goal)
+        width = self.width
+
+        #start and goal are joined to the entrances of their clusters for this search
+        startDist, _ = self.inside(start, startCluster)
+        goalDist, _ = self.inside(goal, goalCluster)
+        startLinks = dict((e, startDist[e]) for e in self.entrances(startCluster) if e in startDist)
+        goalLinks = dict((e, goalDist[e]) for e in self.entrances(goalCluster) if e in goalDist)
+        if startCluster == goalCluster and goal in startDist:
+            return self._refine(board, [start, goal])
+
+        goalX = goal % width
+        goalY = goal // width
+        def estimate(i):
+            return abs(i % width - goalX) + abs(i // width - goalY)
+
+        dist = {start:0}
+        parents = {}
+        closed = set()
+        heap = [(estimate(start), 0, start)]
+        while heap:
+            _, moves, curr = heapq.heappop(heap)
+            if curr in closed:
+                continue
+            if curr == goal:
+                break
+            closed.add(curr)
+            if curr == start:
+                links = list(startLinks.items())
+            else:
+                links = list(self.intra[self.cluster(curr)].get(curr, {}).items())
+            links.extend((other, 1) for other in self.partners.get(curr, ()))
+            if curr in goalLinks:
+                links.append((goal, goalLinks[curr]))
+            for other, cost in links:
+                if other in closed:
+                    continue
+                nextMoves = moves + cost
+                if nextMoves < dist.get(other, nextMoves+1):
+                    dist[other] = nextMoves
+                    parents[other] = curr
+                    heapq.heappush(heap, (nextMoves + estimate(other), nextMoves, other))
+        if goal not in parents:
+            return -1
+
+        waypoints = [goal]
+        while waypoints[-1] != start:
+            waypoints.append(parents[waypoints[-1]])
+        waypoints.reverse()
+        return self._refine(board, waypoints)
+
+    def _refine(self, board, waypoints):
+        """fills in the squares between waypoints, each pair is either
+        paired entrances next to each other or in the same cluster
+        """
+        cells = [waypoints[0]]
+        for a, b in zip(waypoints, waypoints[1:]):
+            if b in self.partners.get(a, ()):
+                cells.append(b)
+                continue
+            _, parents = self.inside(a, self.cluster(a), b)
+            leg = [b]
+            while leg[-1] != a:
+                leg.append(parents[leg[-1]])
+            cells.extend(reversed(leg[:-1]))
+        return [board.pos(i) for i in cells]
@@ -1,26 +1,29 @@
 import json
 import os
-import random
 import bottle
 import math
-import copy
-
-from api import ping_response, start_response, move_response, end_response
-
-"""
-0 = empty space
-1 = food
-2 = enemy head
-3 = my head
-4 = my snaky body
-5 = other snake bodies
-"""
-SPACE = 0
-FOOD = 1
-HEAD = 2
-MYHEAD = 3
-SELF = 4
-BODY = 5
+import time
+import heapq
+from concurrent.futures import ThreadPoolExecutor
+from itertools import repeat
+
+from api import ping_response, start_response, move_response, end_response, metrics_response
+from api import read_json, read_move
+from bitboard import area, canReach, foodBits
+from board import Board, boardContents, vacateTimes, SPACE, FOOD, HEAD, MYHEAD, SELF, BODY
+from engine import Engine, OutOfTime
+from games import GameCache
+from metrics import Metrics
+from pool import USE_POOL, offloadMove, poolReady, startPool
+from search import Territory, dangerField, longestPath
+from topology import CLOCKWISE, COUNTERCLOCKWISE, RING, RING_SLOTS
+
+GAMES = GameCache()#boards kept between turns, by game id
+METRICS = Metrics()#scraped from /metrics, every moves Engine counters are added in
+RECORD_DIR = os.getenv('RECORD_DIR')#if set every /move payload is saved here for bench/
+#meals weighed up at once by determineBestMeal, 0 or 1 does them one by one
+MEAL_WORKERS = int(os.getenv('MEAL_WORKERS', 0))
+MEAL_POOL = ThreadPoolExecutor(max_workers=MEAL_WORKERS) if MEAL_WORKERS > 1 else None
 
 @bottle.route('/')
 def index():
@@ -47,218 +50,158 @@ def ping():
     """
     return ping_response()
 
+@bottle.get('/metrics')
+def metrics():
+    """
+    Stage latencies, search sizes and decision branches
+    in the Prometheus text format.
+    """
+    return metrics_response(METRICS.render())
+
 @bottle.post('/start')
 def start():
-    data = bottle.request.json
+    return startGame(read_json(bottle.request))
+
+def startGame(data):
     print(json.dumps(data))
+    GAMES.start(data)
 
     color = "#00FFFF"
 
     return start_response(color)
 
-def initBoard(height, width, char=0):
-    """creates an empty board(filled with 0's)
-    
-    Arguments:\n
-        height {int} -- the height of the board
-        width {int} -- the width of the board
-    
-    Returns:
-        list of lists -- the empty board
-    """
-    arr = []
-    for _ in range(height):
-        arr.append([])
-        for _ in range(width):
-            arr[-1].append(char)
-    return arr
-
 def makeBoard(data):
     """creates a board to model what is going on in the game
-    
+
     Arguments:\n
         data {dict} -- the game information
-    
+
     Returns:
-        list of list of ints -- the model of what is going on,
-            for details of values see top of file
+        Board -- the model of what is going on,
+            for details of values see top of board.py
     """
     board = data["board"]
-    arr = initBoard(board["height"], board["width"])
-    
-    #food
-    for meal in board["food"]:
-        arr[meal["y"]][meal["x"]] = FOOD
+    theBoard = Board(board["width"], board["height"])
+    cells = theBoard.cells
+    for i, identity in boardContents(data).items():
+        cells[i] = identity
+    theBoard.setFree(vacateTimes(data))
 
-    #snakes
+    #showArr(theBoard)
+    return theBoard
+
+def showArr(board):
+    """shows a board, for debugging ONLY
 
-    for snake in board["snakes"]:
-        isSelf = False
-        if snake["id"] == data["you"]["id"]:
-            isSelf = True
-        x,y = snake["body"][0]["x"], snake["body"][0]["y"]
-        if isSelf:
-            arr[y][x] = MYHEAD
-        else:
-            arr[y][x] = HEAD
-
-        if data["turn"] == 0: #there will be no other bodies
-            return arr
-
-        for part in snake["body"][1:-1]:#-1 so doesnt count tail
-            if isSelf:
-                arr[part["y"]][part["x"]] = SELF
-            else:
-                arr[part["y"]][part["x"]] = BODY
-    
-    #showArr(arr)
-    return arr
-
-def showArr(arr):
-    """shows an array, for debugging ONLY
-    
     Arguments:\n
-        arr {list of lists} -- the array to be shown
+        board {Board} -- the board to be shown
     """
-    for line in arr:
-        for char in line:
-            if char == 0:
-                print("0 ", end="")
+    for y in range(board.height):
+        row = board.cells[y*board.width:(y+1)*board.width]
+        print(" ".join(str(char) for char in row))
 
-            else:
-                print(char,"", end="")
-        print()
 def headPos(data):
     """gets the position of our snakes head
-    
+
     Arguments:\n
         data {dict} -- the game data
-    
+
     Returns:
         tuple -- x,y coordinates of the head
     """
     headTemp = data["you"]["body"][0]
     return (headTemp["x"],headTemp["y"])
 
-def noEnemies(data):
-    """checks if there are any enemies on the board
-    
-    Arguments:\n
-        data {dict} -- the game data
-    
-    Returns:
-        boolean -- true if no other snakes around, else false
-    """
-    return len(data["board"]["snakes"])-1 == 0
-
-
-def retracePath(parents, finalNode, start):
-    """retraces path from destination to start
-    
-    Arguments:\n
-        parents {dict} -- has [parent]:children relationships
-        finalNode {tuple} -- x,y coordinates of final element in path
-        start {tuple} -- x,y coordinates of first element in path
-    
-    Returns:
-        list of tuples -- path from start to finalNode
-    """
-    path=[finalNode]
-    v = finalNode
-    while v != start:
-        v = parents[v]
-        path.insert(0, v)
-    return path
-
-def funkyNewBoard(board, body, pathLen):
-    #board but without tail, length of pathLength
-    nuBoard = copy.deepcopy(board)
-    pathLen -= 1
-    removedSegments = body[-pathLen:]
-    leftovers = body[:-pathLen]
-    for x, y in removedSegments:
-        nuBoard[y][x] = 0
-    for x,y in leftovers:
-        nuBoard[y][x] = 4
-    
-    newHead = leftovers[0]
-    nuBoard[newHead[1]][newHead[0]]=3
-    
-    return nuBoard
-
 def listifyMyBody(data):
     li=[]
     for segment in data["you"]["body"][:-1]:
         li.append((segment["x"], segment["y"]))
     return li
 
-#TODO change where enemies are, remove tails and maybe project heads
-def fixTail(futureAdj, board, path, data):
-    pathLen = len(path)
+#TODO maybe project heads
+def fixTail(board, path, data):
+    """frees up the squares our body would leave behind after taking a path,
+    along with every other body square that empties out by then (see
+    vacateTimes in board.py)
+
+    Arguments:\n
+        board {Board} -- the board after the path is taken, is changed
+        path {list of tuples} -- the x,y coordinates of nodes to be travelled
+        data {dict} -- the game data
+    """
+    moves = len(path)-1
     body = listifyMyBody(data)
     body = path[::-1] + body[1:]#[1:] so doesnt duplicate head
-    newBoard = funkyNewBoard(board, body, pathLen)
-    for segment in body[-(pathLen-1):]:
-        adjNodes = getAdjNodes(newBoard, segment[0], segment[1], True)
-        for node in adjNodes:#adding connections back in
-            if node in futureAdj and not segment in futureAdj[node][0]:
-                futureAdj[node][0].append(segment)
-        futureAdj[segment] = [adjNodes, 0, 1]
-
-def possibleAdj(adjLi, board, path, data):
-    """makes the adjacency list that would result from taken a given path
+    left = set(body[:-moves])
+    for segment in body[-moves:]:
+        if segment not in left:
+            board.change(board.index(segment), SPACE, 1)
+
+    cells = board.cells
+    index = board.index
+    taken = set(index(segment) for segment in left)
+    for turn, i in board.vacating:
+        if turn > moves:
+            break
+        if cells[i] >= SELF and i not in taken:
+            board.change(i, SPACE, 1)
+
+def possibleAdj(board, path, data):
+    """changes the board to what would result from taken a given path,
+    only the squares that change are touched so board.rollback() with
+    the returned checkpoint puts it back the way it was
     note that doesnt remove parts of snake that are no longer there
-    
+
     Arguments:\n
-        adjLi {dict} -- the original ajacency list
+        board {Board} -- the board, is changed
         path {list of tuples} -- the list of x,y coordinates of nodes to be travelled
-    
+
     Returns:
-        dictionary -- the adjacency list if the path is taken
+        int -- the checkpoint from before the path was taken
     """
-    #newLi = adjLi.copy()#DOES NOT WORK
-    newLi = copy.deepcopy(adjLi)
-    for nodeKey in path[:-1]:
-        delAdjNode(newLi, nodeKey)
-    newLi[path[-1]][1]=3
-    fixTail(newLi, board, path, data)
-    return newLi
+    checkpoint = board.checkpoint()
+    index = board.index
+    for node in path[:-1]:
+        board.change(index(node), SELF)
+    board.change(index(path[-1]), MYHEAD)
+    fixTail(board, path, data)
+    return checkpoint
 
 #jan 19 csc labs start
 
-def isSuicide(adjLi, path, board, data):
+def isSuicide(board, path, data):
     """checks if a given path would likely lead to premature snake death
-    
+
     Arguments:\n
-        adjLi {dict} -- the adjacency list
+        board {Board} -- the board
         path {list of tuples} -- nodes the snake would take
-    
+
     Returns:
         boolean -- true if is probably suicide, else false
     """
-    head = path[-1]
-    futureAdj = possibleAdj(adjLi, board, path, data)
-    adjLi[head][1] = MYHEAD#so doesnt find itself
-    minDist = pathToThing(futureAdj, head, FOOD)
-    if type(minDist) != int:
-        minDist = len(minDist)
-    
-    adjLi[head][1] = FOOD#so doesnt find itself
-    return minDist == -1#no path to food from destination
-
-def viewAdjLi(adjLi, data):
-    emptyBoard = initBoard(data["board"]["height"], data["board"]["width"], "D")
-    for key in adjLi:
-        emptyBoard[key[1]][key[0]] = adjLi[key][1]
-    showArr(emptyBoard)
+    checkpoint = possibleAdj(board, path, data)
+    try:
+        return not canReach(board, board.index(path[-1]), foodBits(board))#no path to food from destination
+    finally:
+        board.rollback(checkpoint)
+
+def viewAdjLi(board):
+    """shows which squares can be travelled through, D if they cant
+    for debugging ONLY
+    """
+    for y in range(board.height):
+        row = []
+        for i in range(y*board.width, (y+1)*board.width):
+            row.append(str(board.cells[i]) if board.isOpen(i) else "D")
+        print(" ".join(row))
 
 def dirToAdj(head, adj):
     """finds the direction from one node to an adjacent one.
-    
+
     Arguments:\n
         head {tuple} -- the x,y coordinates of the node being looked from.
         adj {tuple} -- the x,y coordinates of the node being looked towards.
-    
+
     Returns:
         string -- move_response that would get from head to adj.
     """
@@ -273,145 +216,90 @@ def dirToAdj(head, adj):
         theDir = "left"
     return move_response(theDir)
 
-def getAdjNodes(board, x, y, all=False):
-    """finds the adjacent nodes of a node.
-    
+def makeDijk(board, currPos, targets=None, maxCost=None):
+    """finds the cheapest path from the head to every reachable square,
+    a body square can be gone through if the path gets there no sooner
+    than it empties out (see vacateTimes in board.py)
+
     Arguments:\n
-        board {list of lists} -- the board on which the snakes slither.
-        x {int} -- the x position of the square being checked.
-        y {int} -- the y position of the square being checked.
-    
-    Returns:
-        list of tuples -- the keys of adjacent nodes
-    """
-    adj = []
-    if x > 0 and board[y][x-1] < SELF:
-        adj.append((x-1, y))
-    if y > 0 and board[y-1][x] < SELF:
-        adj.append((x, y-1))
-    if all:
-        if x < len(board)-1 and board[y][x+1] < SELF:
-            adj.append((x+1, y))
-        if y < len(board[0])-1 and board[y+1][x] < SELF:
-            adj.append((x, y+1))
-    return adj
-
-def makeWeightBFS(adjLi, startPoint, starting_value):
-    visitQueue = [startPoint]
-    parents={}
-    while visitQueue: #is false only if empty
-        baseKey = visitQueue.pop()
-        currLvl = adjLi[baseKey][2]//1.5
-        if currLvl <= 0:#wont have any more impact
-            break
+        board {Board} -- the weighted board
+        currPos {tuple} -- the x,y coordinate of the snake head
 
-        for adjNode in adjLi[baseKey][0]:
-            if adjNode not in parents.keys(): #if undiscovered
-                parents[adjNode] = baseKey #mark parent relationship
-                adjWeight = adjLi[adjNode][2]
-                if adjWeight < currLvl:
-                    adjLi[adjNode][2] = currLvl
-                elif adjWeight == currLvl:
-                    adjLi[adjNode][2] = currLvl+1
-
-                visitQueue.insert(0, adjNode)
-
-
-def initDijkUndiscovered(adjLi, currPos):
-    table = {}
-    for key in adjLi.keys():
-        table[key] = math.inf
-    table[currPos] = 0
-    return table
-
-def minUndiscovered(undiscovered):
-    minKey = None
-    minPathLen = math.inf
-    for key, nodePath in undiscovered.items():
-        if nodePath < minPathLen or minKey is None:
-            minPathLen = nodePath
-            minKey = key
-    if minPathLen == math.inf:#not reachable by head
-        return None
-    return minKey
-
-def makeDijk(adjLi, currPos):
-    dijkTable = {}#form is (x, y):[minDist, lastVertex] #start as (x,y):[None,None]
-    undiscovered = initDijkUndiscovered(adjLi, currPos)
-    while len(undiscovered) > 0:
-        nextNode = minUndiscovered(undiscovered)
-        if nextNode is None:#isnt reachable by head
-            break
-        currPathLen = dijkTable[nextNode][0] if nextNode in dijkTable else 0
-        for adjNode in adjLi[nextNode][0]:
-            lenToNode = currPathLen + adjLi[adjNode][2]
+    Keyword Arguments:\n
+        targets {iterable of ints} -- cell indices (usually food), stops
+            once all of them are settled. (default: {None})
+        maxCost {int} -- stops once the cheapest unsettled square costs
+            more than this. (default: {None})
 
-            if adjNode in undiscovered and lenToNode < undiscovered[adjNode]:
-                undiscovered[adjNode] = lenToNode
-                dijkTable[adjNode] = [lenToNode, nextNode]
-            elif adjNode in dijkTable and lenToNode < dijkTable[adjNode][0]:
+    Returns:
+        dict -- form is cellIndex:[minDist, lastVertex]
+    """
+    cells = board.cells
+    weights = board.weights
+    free = board.free
+    neighbours = board.neighbours
+    start = board.index(currPos)
+    remaining = None
+    if targets is not None:
+        remaining = set(targets)
+        remaining.discard(start)
+        if not remaining:
+            return {}
+
+    dijkTable = {}
+    settled = bytearray(board.size)
+    dist = {start:0}
+    moves = {start:0}#how many moves the cheapest path to a square takes
+    heap = [(0, start)]
+    while heap:
+        currPathLen, nextNode = heapq.heappop(heap)
+        if settled[nextNode]:#stale entry
+            continue
+        if maxCost is not None and currPathLen > maxCost:
+            break
+        settled[nextNode] = 1
+        if remaining is not None:
+            remaining.discard(nextNode)
+            if not remaining:#every target has its final path
+                break
+
+        arrival = moves[nextNode]+1
+        for adjNode in neighbours[nextNode]:
+            if settled[adjNode] or (cells[adjNode] >= SELF and not 0 < free[adjNode] <= arrival):
+                continue
+            lenToNode = currPathLen + weights[adjNode]
+            if lenToNode < dist.get(adjNode, math.inf):
+                dist[adjNode] = lenToNode
+                moves[adjNode] = arrival
                 dijkTable[adjNode] = [lenToNode, nextNode]
-        del undiscovered[nextNode]#has now been discovered
-    #print("AYAYA", "head at", currPos, adjLi, "dijk", dijkTable)
+                heapq.heappush(heap, (lenToNode, adjNode))
     return dijkTable
 
-def makeWeightedAdj(adjLi, data):
-    WEIGHT_START = 50
-    for snake in data["board"]["snakes"]:
-        if snake["id"] == data["you"]["id"]:
-            continue
-        snakeHead = snake["body"][0]
-        snakeHead = (snakeHead["x"], snakeHead["y"])
-        adjLi[snakeHead][2] = WEIGHT_START
-        makeWeightBFS(adjLi, snakeHead, WEIGHT_START)
-
+def foodCells(board, data):
+    """gets the cell index of every food on the board"""
+    return [board.index((food["x"], food["y"])) for food in data["board"]["food"]]
 
+def makeWeightedAdj(board, data):
+    """weights the board so squares near enemy heads are costly to go through
 
-def makeAdjList(board):
-    """makes the adjacency list for possible squares the snake can traverse
-    
     Arguments:\n
-        board {list of lists} -- the board with ints defining what is there
-            see CONSTANTS at top of file for more info.
-    
-    Returns:
-        dictionary -- the adjacency list, with keys being x,y tuple coordinate
-            of the square and value being a list.
-                [0] is list of adjacent nodes.
-                [1] is int identity of node, see top of file again.
-                [2] is weight of the node
-    """
-    #showArr(board)
-    adjLi = {}
-    for y, line in enumerate(board):
-        for x, el in enumerate(line):
-            key = (x,y)
-            if el < SELF:#if can be traversed through
-                adjNodes = getAdjNodes(board, x, y)
-                for node in adjNodes:
-                    adjLi[node][0].append(key)
-                adjLi[key] = [adjNodes, el, 1]
-    return adjLi
-
-def delAdjNode(adjLi, delNode):
-    """deletes a node and anything referenceing it from the adjacency list
-    
-    Arguments:\n
-        adjLi {dict} -- the adjacency list.
-        delNode {tuple} -- the node to be deleted.
+        board {Board} -- the board, weights are changed in place
+        data {dict} -- the game data
     """
-    #if delNode not in adjLi:
-     #   return
-    for connected in adjLi[delNode][0]:
-        adjLi[connected][0].remove(delNode)
-    del adjLi[delNode]
+    heads = []
+    for snake in data["board"]["snakes"]:
+        if snake["id"] == data["you"]["id"]:
+            continue
+        snakeHead = snake["body"][0]
+        heads.append(board.index((snakeHead["x"], snakeHead["y"])))
+    dangerField(board, heads)
 
 def selfLength(data):
     """finds how long the snake is
-    
+
     Arguments:\n
         data {dict} -- the game data
-    
+
     Returns:
         int -- the snakes length
     """
@@ -421,12 +309,12 @@ def selfLength(data):
 def snakeIsHungry(foodPath, currHp, bodyLen):
     """determines if the snake has enough time to make it to
     the nearest food
-    
+
     Arguments:\n
         currPos {tuple} -- the x,y coordinate of the snakes head
         currHp {int} -- how much health the snake has remaining
         bodyLength {int} -- how long the snake is
-    
+
     Returns:
         boolean -- True if is in danger of starvation, else False
     """
@@ -435,55 +323,34 @@ def snakeIsHungry(foodPath, currHp, bodyLen):
 
     return len(foodPath) > currHp-bodyLen
 
-def tailPos(data):
-    """gets the position of the tail of the snake
-    
-    Arguments:\n
-        data {dict} -- the game data
-    
-    Returns:
-        tuple -- x,y coordinate of the tail
-    """
-    tailSegment = data["you"]["body"][-1]
-    return (tailSegment["x"], tailSegment["y"])
+def regularDFS(board, currPos, visited=None):
+    """finds every square that can be reached from a position
 
-#can pass either int or tuple as target
-def pathToThing(adjLi, headPos, target):
-    """finds the shortest path to a target from the head position
-    
     Arguments:\n
-        adjLi {dict} -- the adjacency list
-        headPos {tuple} -- the starting position position
-        target {tuple or int} -- if is an int will find corresponding 
-            square with that type, if is tuple will find that specific coordinate
-    
+        board {Board} -- the board
+        currPos {tuple} -- the x,y coordinates to start at
+
     Returns:
-        list of tuples or int -- if list of tuples the path to get to target,
-            if there is no path it returns -1
-    """
-    visitQueue = [headPos]
-    parents = {}
-    while visitQueue: #is false only if empty
-        baseKey = visitQueue.pop()
-        for adjNode in adjLi[baseKey][0]:
-            if adjNode not in parents.keys(): #if undiscovered
-                parents[adjNode] = baseKey #mark parent relationship
-                #if adjNode not in adjLi:
-                #    print("generalAYAYA", "head at",headPos, "going to", target, adjNode, adjLi)
-                if adjNode == target or adjLi[adjNode][1] == target:
-                    path = retracePath(parents, adjNode, headPos)
-                    return path
-
-                visitQueue.insert(0, adjNode)
-    return -1
-
-def regularDFS(adjLi, currPos, visited):
-    visited.append(currPos)
-    for adj in adjLi[currPos][0]:
-        if adj in visited:
+        list of tuples -- the reachable squares, in the order they were found
+    """
+    cells = board.cells
+    neighbours = board.neighbours
+    seen = bytearray(board.size)
+    order = []
+    stack = [board.index(currPos)]
+    while stack:
+        curr = stack.pop()
+        if seen[curr]:#pushed again before it was got to
             continue
-        regularDFS(adjLi, adj, visited)
-
+        seen[curr] = 1#marked when visited so the order is the same as recursing
+        order.append(curr)
+        for adj in reversed(neighbours[curr]):
+            if not seen[adj] and cells[adj] < SELF:
+                stack.append(adj)
+
+    if visited is None:
+        visited = []
+    visited.extend(board.pos(i) for i in order)
     return visited
 
 dirAdds = ((-1,0),(1,0),(0,-1), (0,1))
@@ -495,8 +362,8 @@ def areAdjacent(a, b):
             return True
     return False
 
-def getFurthestSquare(adjLi, currPos, board, data):
-    reachableSquares = regularDFS(adjLi, currPos, [])
+def getFurthestSquare(board, currPos, data):
+    reachableSquares = regularDFS(board, currPos)
     bodyLi = listifyMyBody(data)
     for bodyPiece in bodyLi[::-1]:
         for square in reachableSquares:
@@ -508,134 +375,72 @@ def getFurthestSquare(adjLi, currPos, board, data):
     #make another dict  whwere key=(x,y) space, value= sum of position of body pieces
     #return one with maximum value
 
-ITERATIONS = 15
+STALL_BUDGET = 0.05#seconds spent looking for a long path
 #TODO make it so tries to be near food and protects it
 #XXX
-def stallForTime(adjLi, currPos, board, data, bestMeal=None):
-    global ITERATIONS
-    """makes the snake move around in a way that will best maximize 
+def stallForTime(engine):
+    """makes the snake move around in a way that will best maximize
     the space it takes up, will chase its tail if it can,
-    otherwise take the path that will maximize space taken up
+    otherwise take the path that will maximize space taken up.
+    the search stops at the engines deadline even if STALL_BUDGET
+    is not used up
 
     Arguments:\n
-        adjLi {dict} -- the adjacency list
-        currPos {tuple} -- the x,y coordinate of the snake head
-        data {nested dictionary} -- all the game data
+        engine {Engine} -- the move being worked out
 
     Returns:
         move_response -- the direction that will best stall for time
     """
+    board = engine.board
+    currPos = engine.currPos
+    data = engine.data
 
-    ouroborous = pathToThing(adjLi, currPos, tailPos(data))
+    ouroborous = engine.tailPath()
     if ouroborous != -1 and len(ouroborous) > 1:# and ouroborousIsSafe(adjLi, ouroborous, board):
         return dirToAdj(currPos, ouroborous[1])
     #if past this there is no path to tail
-    targetSquare = getFurthestSquare(adjLi, currPos, board, data)
+    targetSquare = getFurthestSquare(board, currPos, data)
     #print("head is", currPos, "furthest square is", targetSquare)
     if targetSquare == currPos:#if already in that spot
         targetSquare = None
-    
-    path = longestDfs(adjLi, currPos, ITERATIONS, targetSquare)
-    print("longest dfs success")
+
+    target = None if targetSquare is None else board.index(targetSquare)
+    stallDeadline = time.perf_counter()+STALL_BUDGET
+    if engine.deadline is not None:
+        stallDeadline = min(stallDeadline, engine.deadline)
+    stats = {}
+    path = longestPath(board, board.index(currPos), target,
+        deadline=stallDeadline, limit=engine.area(), stats=stats, rng=engine.rng)
+    engine.nodes("longestPath", stats["steps"])
     if len(path) == 1:
         return errMove()
-    return dirToAdj(currPos,path[1])
+    return dirToAdj(currPos, board.pos(path[1]))
 
-def noAvailableEnemies(adjLi, currPos):
-    return pathToThing(adjLi, currPos, HEAD) == -1
-
-def longestDfs(adjLi, currPos, iterations, targetSquare):
-    """finds a decently long path from currPos, 
-    ends if is no longer continuous
-    
-    Arguments:\n
-        adjLi {dict} -- the adjacency list for the positioning.
-        currPos {tuple} -- the x,y coordinate of the snake head.
-        iterations {int} -- how many times it should look around for a new path.
-    
-    Returns:
-        list of tuples -- the longest path it could find, starting at the head.
-    """
-    global DFSLen
-    max = [None,0]
-    for _ in range(iterations):
-        DFSLen = None
-        curr = DFS(adjLi, currPos, targetSquare, [])
-        if DFSLen > max[1]:
-            max = [curr, DFSLen]
-    return max[0]
-
-DFSLen = None
-
-def DFS(adjLi, currPos, targetSquare, visited):
-    """performs depth first search, choosing randomly from given options
-        note that when backs out for first time the search stops
-    
-    Arguments:\n
-        adjLi {dicitonary} -- the adjacency list.
-        currPos {tuple} -- the x,y coordinates of the start of dfs.
-    
-    Keyword Arguments:\n
-        visited {list} -- list of visited nodes.
-    
-    Returns:
-        list of tuples -- sequence of nodes from currPos to end
-    """
-    global DFSLen
-
-    if DFSLen is not None:#path that will be used is already done
-        return
-
-    visited.append(currPos)
-
-    if currPos == targetSquare:#got to destination
-        DFSLen = len(visited)
-        return visited
-        
-    options = copy.deepcopy(adjLi[currPos][0])
-    random.shuffle(options)
-
-    for adj in options:
-        if adj in visited:
-            continue
-        DFS(adjLi, adj, targetSquare, visited)
-    
-    if DFSLen is None:
-        DFSLen = len(visited)
-    return visited
-        
-#TODO make it more efficient
-def getCorners(pos):
-    """gets all positions in a square around a given position
+def getCorners(pos, board):
+    """gets the squares on the board in a ring around a given position,
+    the 5x5 square without the 3x3 middle. comes from the boards
+    topology so nothing is built
 
     Arguments:\n
         pos {tuple} -- the x,y coordinates of a node
+        board {Board} -- the board
 
     Returns:
-        list of tuples-- the positions in the "strike zone"
+        tuple of ints -- the cells in the "strike zone"
     """
-    arr = []
-    xStart = pos[0]
-    yStart = pos[1]
-    for x in range(xStart-2, xStart+3):
-        for y in range(yStart-2, yStart+3):
-            arr.append((x,y))
-
-    for x in range(xStart-1, xStart+2):
-        for y in range(yStart-1, yStart+2):
-            arr.remove((x,y))
-    return arr
+    return board.topology.rings[board.index(pos)]
 
 #XXX replace this with better option?
-def safetyRating(square, adjLi):
-    if square not in adjLi:
+def safetyRating(square, board):
+    i = board.index(square)
+    if i is None or not board.isOpen(i):
         return None
     score = 0
-    for neighbor in adjLi[square][0]:
-        score += adjLi[neighbor][2]
+    for neighbor in board.adj(i):
+        score += board.weights[neighbor]
     return score
 
-def getSafestOption(sqA, ratingA, sqB, ratingB, adjLi):
+def getSafestOption(sqA, ratingA, sqB, ratingB):
     if ratingA is None and ratingB is None:
         return None
 
@@ -643,50 +448,36 @@ def getSafestOption(sqA, ratingA, sqB, ratingB, adjLi):
         return sqB
     if ratingB is None:
         return sqA
-    
+
     if ratingA < ratingB:
         return sqA
     return sqB
     #result = sqA if ratingA < ratingB else sqB
     #return result
 
-CW_DICT = {(-2,-1):(-2,0), (-2,0):(-2,1),
-(-2,1):(-2, 2), (-2, 2):(-1, 2), (-1,2):(0,2),
-(0,2):(1,2), (1,2):(2,2), (2,2):(2,1), (2,1):(2,0),
-(2,0):(2,-1), (2,-1):(2,-2), (2,-2):(1,-2), (1,-2):(0,-2),
-(0,-2):(-1,-2), (-1,-2):(-2,-2), (-2,-2):(-2,-1)}
-
-CCW_DICT = {(-2, 0):(-2, -1), (-2, 1):(-2, 0),
-(-2, 2):(-2, 1), (-1, 2):(-2, 2), (0, 2):(-1, 2),
-(1, 2):(0, 2), (2, 2):(1, 2), (2, 1):(2, 2), (2, 0):(2, 1),
-(2, -1):(2, 0), (2,-2):(2, -1), (1, -2):(2, -2), (0, -2):(1, -2),
-(-1, -2):(0, -2),(-2, -2):(-1, -2), (-2, -1):(-2, -2)}
-
 #true is clockwise
 def rotateAttack(currPos, enemyHead, rotateDir=True, returnMove=True):
-    global CW_DICT, CCW_DICT
-    posDiff = (currPos[0]-enemyHead[0], currPos[1]-enemyHead[1])
-
-    newDiff =CW_DICT[posDiff] if rotateDir else CCW_DICT[posDiff]
+    slot = RING_SLOTS[(currPos[0]-enemyHead[0], currPos[1]-enemyHead[1])]
+    newDiff = RING[CLOCKWISE[slot] if rotateDir else COUNTERCLOCKWISE[slot]]
     if returnMove:
         return dirToAdj(currPos, (newDiff[0]+enemyHead[0], newDiff[1]+enemyHead[1]))
     else:
         return (newDiff[0]+enemyHead[0], newDiff[1]+enemyHead[1])
 
-def clockwiseSquare(currPos, enemyHead, board):
+def clockwiseSquare(currPos, enemyHead):
     return rotateAttack(currPos, enemyHead, True, False)
 
-def counterclockwiseSquare(currPos, enemyHead, board):
+def counterclockwiseSquare(currPos, enemyHead):
     return rotateAttack(currPos, enemyHead, False, False)
 
-def safeDir(currPos, enemyHead, board, adjLi):
-    cwSquare = clockwiseSquare(currPos, enemyHead, board)
-    cwRating = safetyRating(cwSquare, adjLi)
+def safeDir(currPos, enemyHead, board):
+    cwSquare = clockwiseSquare(currPos, enemyHead)
+    cwRating = safetyRating(cwSquare, board)
 
-    ccwSquare = counterclockwiseSquare(currPos, enemyHead, board)
-    ccwRating = safetyRating(ccwSquare, adjLi)
+    ccwSquare = counterclockwiseSquare(currPos, enemyHead)
+    ccwRating = safetyRating(ccwSquare, board)
 
-    bestOption = getSafestOption(cwSquare, cwRating, ccwSquare, ccwRating, adjLi)
+    bestOption = getSafestOption(cwSquare, cwRating, ccwSquare, ccwRating)
     if bestOption is None:
         return None#nowhere is safe
     else:
@@ -694,74 +485,121 @@ def safeDir(currPos, enemyHead, board, adjLi):
 
 #TODO figure out how to pick best side, maybe take average of DFS
 #at each possibility, pick longest one
-def sideBlock(currPos, enemyHead, adjLi, board, data):
-    safeSpace = safeDir(currPos, enemyHead, board, adjLi)
+def sideBlock(engine, enemyHead):
+    currPos = engine.currPos
+    safeSpace = safeDir(currPos, enemyHead, engine.board)
     if safeSpace is not None:
         return dirToAdj(currPos, safeSpace)
     else:
-        return stallForTime(adjLi, currPos, board, data) 
+        return stallForTime(engine)
+
+def moveTerritories(board, currPos, data):
+    """finds how much of the board we would own after each possible move,
+    enemies are left where they are so they get to the squares next to
+    them as fast as we get to ours
+
+    Arguments:\n
+        board {Board} -- the board
+        currPos {tuple} -- the x,y coordinate of the snake head
+        data {dict} -- the game data
+
+    Returns:
+        dict -- cell index of the move:number of squares we would own
+    """
+    enemies = []
+    for snake in data["board"]["snakes"]:
+        if snake["id"] == data["you"]["id"]:
+            continue
+        snakeHead = snake["body"][0]
+        enemies.append((board.index((snakeHead["x"], snakeHead["y"])), 0, len(snake["body"])))
+
+    head = board.index(currPos)
+    bodyLen = selfLength(data)
+    options = board.adj(head)
+    checkpoint = board.checkpoint()
+    board.change(head, SELF)#old head is part of the body after moving
+    try:
+        return dict((adj, Territory(board, [(adj, 1, bodyLen)] + enemies).sizes[0])
+            for adj in options)
+    finally:
+        board.rollback(checkpoint)
+
+def safeMove(board, currPos, data):
+    """a cheap move to fall back on if there is no time to think,
+    goes to the open square next to the head that would give us the
+    most territory, the least dangerous one if that is tied
+
+    Arguments:\n
+        board {Board} -- the weighted board
+        currPos {tuple} -- the x,y coordinate of the snake head
+        data {dict} -- the game data
+
+    Returns:
+        move_response -- the direction to go
+    """
+    weights = board.weights
+    best = None
+    for adj, owned in moveTerritories(board, currPos, data).items():
+        score = (-owned, weights[adj], -len(board.adj(adj)))#more space, less danger, more room
+        if best is None or score < best[0]:
+            best = (score, adj)
+    if best is None:
+        return errMove()
+    return dirToAdj(currPos, board.pos(best[1]))
 
 def errMove():
     """for when there is no good option
-    
+
     Returns:
         move_response("up")
     """
     return move_response("up")
 
-def attackProtocol(adjLi, currPos, board, data):
+def attackProtocol(engine):
     """
         WIP
     """
     #print("FOR BLOOD, FOR GLORY")
-    pathToVictim = pathToThing(adjLi, currPos, HEAD)
+    currPos = engine.currPos
+    field = engine.field
+    pathToVictim = field.nearest(HEAD)
     victimHead = None
     if pathToVictim == -1:
         #print("NO PATH TO VICTIM")
-        return stallForTime(adjLi, currPos, board, data)
+        return stallForTime(engine)
     else:#if no victim in range
         victimHead = pathToVictim[-1]
-    
-    shortestPath = None
-    for corner in getCorners(victimHead):
-        pathToCorner = pathToThing(adjLi, currPos, corner)
-        if pathToCorner == -1:
-            continue
-        if shortestPath is None or len(pathToCorner) < len(shortestPath):
-            shortestPath = pathToCorner
 
-    if shortestPath is None:
+    shortestPath = field.nearestCell(getCorners(victimHead, engine.board))
+
+    if shortestPath == -1:
         #print("cant get to victim corner")
-        return stallForTime(adjLi, currPos, board, data)
+        return stallForTime(engine)
     if len(shortestPath) == 1:
         print("in the right spot", currPos)
         #showArr(board)
-        return sideBlock(currPos, victimHead, adjLi, board, data)
+        return sideBlock(engine, victimHead)
     else:
         #print("going that way")
         return dirToAdj(currPos, shortestPath[1])#go to that square
 
 #should take some stuff from getFoodPaths()
-def dijkRetrace(start, food, dijkTable):
-    curr = (food["x"], food["y"])
+def dijkRetrace(board, start, food, dijkTable):
+    curr = board.index((food["x"], food["y"]))
     if curr not in dijkTable:
         return None
+    start = board.index(start)
     path=[dijkTable[curr][0], curr]
     for _ in range(len(dijkTable)):#is practically infinite loop
-        #if curr not in dijkTable:
-        #    print("dijkAYAYA", "head at",start, "food at", food, dijkTable)
-
         curr = dijkTable[curr][1]
-        path.insert(1, curr)
+        path.append(curr)
         if curr == start:
-            return path
+            return path[:1] + [board.pos(i) for i in reversed(path[1:])]
 
-def getFoodPaths(dijkTable, adjLi, data, head):
+def getFoodPaths(dijkTable, board, data, head):
     allPaths = []
     for food in data["board"]["food"]:
-        error=False
-        curr = (food["x"], food["y"])
-        path=dijkRetrace(head, food, dijkTable)
+        path=dijkRetrace(board, head, food, dijkTable)
         if path is not None:
             allPaths.append(path)
     return sorted(allPaths, key=lambda path:path[0])
@@ -775,29 +613,110 @@ def mindex(ratios):
             minDex = i
     return minDex
 
-def determineBestMeal(adjLi, allFoodPaths, currHp, bodyLen, board, data):
+def mealSpace(board, path, data):
+    """how many squares can be reached from a food after taking the path
+    to it, the board is left the way it was
+
+    Arguments:\n
+        board {Board} -- the board
+        path {list} -- the cost followed by the x,y coordinates of the path
+        data {dict} -- the game data
+
+    Returns:
+        int -- the number of reachable squares
+    """
+    checkpoint = possibleAdj(board, path[1:], data)
+    try:
+        return area(board, board.index(path[-1]))
+    finally:
+        board.rollback(checkpoint)
+
+def mealKey(board, path, data):
+    """the zobrist hash of the board after taking a path to food,
+    mealSpace() only depends on this so it is what the table is keyed by
+    """
+    checkpoint = possibleAdj(board, path[1:], data)
+    try:
+        return board.zobrist()
+    finally:
+        board.rollback(checkpoint)
+
+def determineBestMeal(engine, allFoodPaths):
+    """finds the meal with the most space to move around in after it for
+    what it costs to get there.
+    a path cant reach more squares than are open now plus the ones it
+    frees up, so paths that couldnt beat the best so far even then are
+    never searched. boards that were already searched, this turn or an
+    earlier one, come out of the engines table. if the engine has an
+    executor the rest are searched a few at a time on copies of the
+    board, the answer is the same.
+
+    Arguments:\n
+        engine {Engine} -- the move being worked out
+        allFoodPaths {list} -- from getFoodPaths, cheapest first
+
+    Returns:
+        list -- the best path like allFoodPaths, None if none are worth it
+    """
     #return allFoodPaths[0]#works better
+    board = engine.board
+    data = engine.data
+    currHp = data["you"]["health"]
+    bodyLen = selfLength(data)
+    executor = engine.executor
+    table = engine.table
+    hits = misses = 0
+    batchSize = max(MEAL_WORKERS, 2) if executor is not None else 1
     allFoodPaths = [path for path in allFoodPaths if len(path)-1 >= currHp-bodyLen]
     #print("all foods is", allFoodPaths)
     #justPaths = [path[1:] for path in allFoodPaths]
-    #nonSuicidal = [path for path in justPaths if not isSuicide(adjLi, path, board, data)]
-    
+    #nonSuicidal = [path for path in justPaths if not isSuicide(board, path, data)]
+    openSquares = board.size - board.cells.count(SELF) - board.cells.count(BODY)
+
     minRatio = 0
     minPath = None
-    for i, path in enumerate(allFoodPaths):
-        justPath = path[1:]
-        futurePosition = possibleAdj(adjLi, board, justPath, data)
-        reachableSquares = regularDFS(futurePosition, path[-1], [])
-        ratio = len(reachableSquares)/path[0]
-        if ratio > minRatio:
-            minRatio = ratio
-            minPath = path
-    #maybe check number of all reachable squares and take ratio of 
+    i = 0
+    while i < len(allFoodPaths):
+        if i > 0 and engine.outOfTime():#paths are cheapest first, keep the best so far
+            break
+        batch = []
+        while i < len(allFoodPaths) and len(batch) < batchSize:
+            path = allFoodPaths[i]
+            i += 1
+            if (openSquares+len(path))/path[0] > minRatio:#could still be the best
+                batch.append(path)
+        keys = [None]*len(batch)
+        spaces = [None]*len(batch)
+        if table is not None:
+            keys = [mealKey(board, path, data) for path in batch]
+            spaces = [table.get(key) for key in keys]
+        todo = [j for j, space in enumerate(spaces) if space is None]
+        hits += len(batch)-len(todo)
+        misses += len(todo)
+        if len(todo) > 1:
+            found = executor.map(mealSpace, [board.copy() for _ in todo],
+                [batch[j] for j in todo], repeat(data))
+        else:
+            found = [mealSpace(board, batch[j], data) for j in todo]
+        for j, space in zip(todo, found):
+            spaces[j] = space
+            engine.nodes("flood", space)
+            if table is not None:
+                table.put(keys[j], space)
+
+        for path, space in zip(batch, spaces):
+            ratio = space/path[0]
+            if ratio > minRatio:
+                minRatio = ratio
+                minPath = path
+    #maybe check number of all reachable squares and take ratio of
+    if table is not None:
+        engine.lookups("meals", hits, misses)
     if len(allFoodPaths) > 0:
         return minPath
     else:
         return None
-    
+
     '''if len(nonSuicidal) > 0:
         return nonSuicidal[0]#remember that sorted by weighted sums
     else:
@@ -816,36 +735,160 @@ find a better way to find path to food and other things
 find way to keep snake in strike zone and find best path to do so
 '''
 
-@bottle.post('/move')
-def move():
-    data = bottle.request.json
+#how long a move may take, the games own timeout is used if it is tighter
+MOVE_BUDGET = float(os.getenv('MOVE_BUDGET_MS', 250))/1000
+#time left for the response to get back to the engine
+LATENCY_MARGIN = float(os.getenv('LATENCY_MARGIN_MS', 150))/1000
+
+def moveDeadline(data, started):
+    """works out when a move has to be decided by
+
+    Arguments:\n
+        data {dict} -- the game data
+        started {float} -- time.perf_counter() when the request came in
+
+    Returns:
+        float -- the time.perf_counter() value to be done by
+    """
+    budget = MOVE_BUDGET
+    timeout = data.get("game", {}).get("timeout")
+    if timeout:
+        budget = min(budget, timeout/1000.0 - LATENCY_MARGIN)
+    return started + max(budget, 0)
+
+def recordMove(data):
+    """saves a /move payload to RECORD_DIR so it can be replayed by bench/replay.py"""
+    name = "%s-%s.json" % (data.get("game", {}).get("id"), data.get("turn"))
+    with open(os.path.join(RECORD_DIR, name), "w") as f:
+        json.dump(data, f)
+
+def findFoodPaths(engine):
+    """every reachable foods cheapest path, cheapest first like getFoodPaths,
+    from the games kept routes if it has them (see routes.py)
+    """
+    board = engine.board
+    currPos = engine.currPos
+    data = engine.data
+    started = time.perf_counter()
+    if engine.routes is not None:
+        settled = engine.routes.update(board, foodCells(board, data))
+        allFoodPaths = engine.routes.paths(board, board.index(currPos))
+        engine.timed("foodRoutes", started)
+        engine.nodes("foodRoutes", settled)
+    else:
+        dijkTable = makeDijk(board, currPos, foodCells(board, data))
+        engine.timed("makeDijk", started)
+        engine.nodes("makeDijk", len(dijkTable))
+        allFoodPaths = getFoodPaths(dijkTable, board, data, currPos)
+    return allFoodPaths
+
+def findBestMeal(engine):
+    allFoodPaths = engine.fact("foodPaths", findFoodPaths)
+    engine.checkTime()
+    started = time.perf_counter()
+    bestMeal = determineBestMeal(engine, allFoodPaths)
+    engine.timed("determineBestMeal", started)
+    return bestMeal
+
+def mightEat(engine):
+    """false if no food path could be long enough for determineBestMeal
+    to take it, which only takes ones at least currHp-bodyLen long. a path
+    cant go through more squares than can be reached, counting the body
+    squares that empty out, so the food isnt searched at all then
+    """
+    if not engine.foodInReach():
+        return False
+    data = engine.data
+    longest = engine.area() + len(engine.board.vacating)
+    return longest >= data["you"]["health"]-selfLength(data)
+
+def decideMove(engine):
+    """picks the move, raises OutOfTime if the deadline passes between stages.
+    what each branch needs is worked out the first time it is asked for
+    (see Engine.fact) so branches that arent taken cost nothing
+
+    Arguments:\n
+        engine {Engine} -- the move being worked out, needs its board weighted
+
+    Returns:
+        move_response -- the direction to go
+    """
+    currPos = engine.currPos
+    data = engine.data
     currHp = data["you"]["health"]
-    currPos = headPos(data)
     bodyLen = selfLength(data)
 
-    board = makeBoard(data)
-    adjLi = makeAdjList(board)
-    makeWeightedAdj(adjLi, data)
-    dijkTable = makeDijk(adjLi, currPos)
-    
-    allFoodPaths = getFoodPaths(dijkTable, adjLi, data, currPos)
-    if len(allFoodPaths) == 0:#no path to food
-        if noAvailableEnemies(adjLi, currPos):#no nearby enemies
-            return stallForTime(adjLi, currPos, board, data)
-        else:#are nearby enemies
-            return attackProtocol(adjLi, currPos, board, data)
-
-    #if here there is a food path
-    #determine best meal is messing with list
-    bestMeal = determineBestMeal(adjLi, allFoodPaths, currHp, bodyLen, board, data)
+    bestMeal = None
+    if mightEat(engine):
+        bestMeal = engine.fact("bestMeal", findBestMeal)
     if snakeIsHungry(bestMeal, currHp, bodyLen):
+        engine.branch("hungry")
         return dirToAdj(currPos, bestMeal[2])#0 is value, 1 is head
+    engine.checkTime()
 
-    if noEnemies(data):
-        stallForTime(adjLi, currPos, board, data)
+    started = time.perf_counter()
+    if not engine.enemyReachable():#no enemies or none we can get to
+        engine.branch("stall")
+        theMove = stallForTime(engine)
+        engine.timed("stallForTime", started)
+        return theMove
 
     #if here snake isnt hungry and ready to wreck some fools
-    return attackProtocol(adjLi, currPos, board, data)
+    engine.branch("attack")
+    theMove = attackProtocol(engine)
+    engine.timed("attackProtocol", started)
+    return theMove
+
+@bottle.post('/move')
+def move():
+    started = time.perf_counter()
+    return playMove(read_move(bottle.request), started)
+
+def playMove(data, started):
+    """works out a move for a /move request
+
+    Arguments:\n
+        data {dict} -- the game data
+        started {float} -- time.perf_counter() when the request came in,
+            the move budget counts from here
+
+    Returns:
+        move_response -- the direction to go
+    """
+    if RECORD_DIR:
+        recordMove(data)
+    engine = Engine(data, deadline=moveDeadline(data, started), executor=MEAL_POOL)
+    currPos = engine.currPos
+
+    state = GAMES.checkout(data)
+    engine.table = state.table
+    engine.routes = state.routes
+    engine.hierarchy = state.hierarchy
+    try:
+        board = engine.board = state.update(data)
+        stageStart = engine.timed("board", started)
+        makeWeightedAdj(board, data)
+        stageStart = engine.timed("makeWeightedAdj", stageStart)
+        fallback = safeMove(board, currPos, data)#ready before anything expensive
+        stageStart = engine.timed("safeMove", stageStart)
+
+        try:
+            if poolReady():#until it is, moves are done here
+                direction, counts = offloadMove(board, data, engine.deadline)
+                engine.timed("pool", stageStart)
+                if counts is not None:
+                    engine.metrics.merge(counts)
+                if direction is None:
+                    raise OutOfTime()
+                return move_response(direction)
+            return decideMove(engine)
+        except OutOfTime:
+            engine.branch("fallback")
+            return fallback
+    finally:
+        GAMES.checkin(state)
+        engine.timed("move", started)
+        METRICS.merge(engine.metrics.drain())
 
     #showArr(board)
     #print(json.dumps(data))
@@ -857,13 +900,19 @@ def move():
 
 @bottle.post('/end')
 def end():
-    #data = bottle.request.json
+    return endGame(read_json(bottle.request))
+
+def endGame(data):
+    GAMES.end(data)
 
     return end_response()
 
 # Expose WSGI app (so gunicorn can find it)
 application = bottle.default_app()
 
+if USE_POOL:#workers start loading now instead of on the first move
+    startPool()
+
 if __name__ == '__main__':
     bottle.run(
         application,
@@ -0,0 +1,140 @@
+import threading
+from bisect import bisect_left
+
+#upper bounds of the latency buckets in seconds
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+    0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+class Metrics(object):
+    """counts what the snake is doing so it can be scraped from /metrics,
+    everything is kept as plain counters so recording is cheap enough
+    to leave on all the time
+
+    stage latency is kept by stage and board size, nodes expanded by
+    search and board size, and moves by which branch decided them
+    """
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.latency = {}#(stage, size):[bucket counts..., +Inf count, sum]
+        self.expanded = {}#(search, size):nodes
+        self.searches = {}#(search, size):times run
+        self.branches = {}#branch:moves
+        self.tables = {}#(table, hit or miss):lookups
+        self.lock = threading.Lock()
+
+    def observe(self, stage, size, seconds):
+        """records how long a stage took
+
+        Arguments:\n
+            stage {str} -- the name of the stage
+            size {str} -- the board size, like 11x11
+            seconds {float} -- how long it took
+        """
+        key = (stage, size)
+        with self.lock:
+            counts = self.latency.get(key)
+            if counts is None:
+                counts = self.latency[key] = [0]*(len(self.buckets)+1) + [0.0]
+            counts[bisect_left(self.buckets, seconds)] += 1
+            counts[-1] += seconds
+
+    def nodes(self, search, size, count):
+        """records how many squares a search looked at"""
+        key = (search, size)
+        with self.lock:
+            self.expanded[key] = self.expanded.get(key, 0) + count
+            self.searches[key] = self.searches.get(key, 0) + 1
+
+    def lookups(self, table, hits, misses):
+        """records how many lookups in a transposition table hit and missed"""
+        with self.lock:
+            for result, count in (("hit", hits), ("miss", misses)):
+                key = (table, result)
+                self.tables[key] = self.tables.get(key, 0) + count
+
+    def branch(self, name):
+        """records which part of the decision picked the move"""
+        with self.lock:
+            self.branches[name] = self.branches.get(name, 0) + 1
+
+    def drain(self):
+        """takes everything recorded so far and starts counting from zero,
+        for handing counts from a worker process back to the server
+
+        Returns:
+            tuple -- the counters, to be given to merge()
+        """
+        with self.lock:
+            counts = (self.latency, self.expanded, self.searches, self.branches, self.tables)
+            self.latency = {}
+            self.expanded = {}
+            self.searches = {}
+            self.branches = {}
+            self.tables = {}
+        return counts
+
+    def merge(self, counts):
+        """adds in counters that drain() took from another Metrics"""
+        latency, expanded, searches, branches, tables = counts
+        with self.lock:
+            for key, added in latency.items():
+                totals = self.latency.get(key)
+                if totals is None:
+                    totals = self.latency[key] = [0]*(len(self.buckets)+1) + [0.0]
+                for i, value in enumerate(added):
+                    totals[i] += value
+            for mine, theirs in ((self.expanded, expanded), (self.searches, searches),
+                    (self.branches, branches), (self.tables, tables)):
+                for key, value in theirs.items():
+                    mine[key] = mine.get(key, 0) + value
+
+    def render(self):
+        """the metrics in the Prometheus text format
+
+        Returns:
+            str -- the body for /metrics
+        """
+        with self.lock:
+            latency = dict((key, list(counts)) for key, counts in self.latency.items())
+            expanded = dict(self.expanded)
+            searches = dict(self.searches)
+            branches = dict(self.branches)
+            tables = dict(self.tables)
+
+        lines = [
+            "# HELP snake_stage_seconds Time spent in each stage of a move.",
+            "# TYPE snake_stage_seconds histogram",
+        ]
+        for (stage, size), counts in sorted(latency.items()):
+            labels = 'stage="%s",board="%s"' % (stage, size)
+            total = 0
+            for bound, count in zip(self.buckets, counts):
+                total += count
+                lines.append('snake_stage_seconds_bucket{%s,le="%g"} %d' % (labels, bound, total))
+            total += counts[len(self.buckets)]
+            lines.append('snake_stage_seconds_bucket{%s,le="+Inf"} %d' % (labels, total))
+            lines.append('snake_stage_seconds_sum{%s} %.6f' % (labels, counts[-1]))
+            lines.append('snake_stage_seconds_count{%s} %d' % (labels, total))
+
+        lines.append("# HELP snake_nodes_expanded_total Squares looked at by each search.")
+        lines.append("# TYPE snake_nodes_expanded_total counter")
+        for (search, size), count in sorted(expanded.items()):
+            lines.append('snake_nodes_expanded_total{search="%s",board="%s"} %d' % (search, size, count))
+        lines.append("# HELP snake_searches_total Times each search was run.")
+        lines.append("# TYPE snake_searches_total counter")
+        for (search, size), count in sorted(searches.items()):
+            lines.append('snake_searches_total{search="%s",board="%s"} %d' % (search, size, count))
+
+        lines.append("# HELP snake_moves_total Moves by the branch that decided them.")
+        lines.append("# TYPE snake_moves_total counter")
+        for name, count in sorted(branches.items()):
+            lines.append('snake_moves_total{branch="%s"} %d' % (name, count))
+        lines.append("# HELP snake_table_lookups_total Transposition table lookups by whether they hit.")
+        lines.append("# TYPE snake_table_lookups_total counter")
+        for (table, result), count in sorted(tables.items()):
+            lines.append('snake_table_lookups_total{table="%s",result="%s"} %d' % (table, result, count))
+        return "\n".join(lines) + "\n"
+
+def boardSize(board):
+    """the label a board is recorded under, like 11x11"""
+    return "%dx%d" % (board.width, board.height)
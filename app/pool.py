@@ -0,0 +1,133 @@
+"""
+runs the expensive part of a move (decideMove, so determineBestMeal,
+attackProtocol and stallForTime) in a pool of worker processes so a
+busy instance can use all of its cores.
+
+the board is sent over as its raw buffers along with the slimmed down
+game data, so a worker doesnt have to build anything from json.
+turned on with MOVE_POOL=1, POOL_WORKERS sets how many processes
+(defaults to one per core). the pool is started when main.py is loaded,
+moves are worked out in the server process until every worker is ready.
+"""
+import importlib
+import multiprocessing
+import os
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from board import Board
+
+USE_POOL = os.getenv('MOVE_POOL', '') not in ('', '0')
+POOL_WORKERS = int(os.getenv('POOL_WORKERS', 0)) or os.cpu_count() or 1
+
+_pool = None
+_warming = []#futures of the warm() calls, the pool is ready once all are done
+
+def startPool():
+    """starts the worker processes without waiting for them,
+    does nothing inside a worker or if the pool is already going
+
+    Returns:
+        ProcessPoolExecutor -- the pool, None inside a worker
+    """
+    global _pool, _warming
+    if multiprocessing.parent_process() is not None:#a worker loading main
+        return None
+    if _pool is None:
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("forkserver" if "forkserver" in methods else None)
+        _pool = ProcessPoolExecutor(max_workers=POOL_WORKERS, mp_context=context)
+        _warming = [_pool.submit(warm) for _ in range(POOL_WORKERS)]
+    return _pool
+
+def poolReady():
+    """true once the pool is started and every worker has loaded main"""
+    if _pool is None:
+        return False
+    for future in _warming:
+        if not future.done():
+            return False
+        if future.exception() is not None:#broke while starting
+            stopPool()
+            return False
+    return True
+
+def stopPool():
+    global _pool, _warming
+    if _pool is not None:
+        _pool.shutdown(wait=False)
+        _pool = None
+        _warming = []
+
+def warm():
+    """loads everything a worker needs before the first real move"""
+    importlib.import_module("main")
+    return os.getpid()
+
+def packBoard(board):
+    """the board as a few strings of bytes, cheap to send to a worker"""
+    return (board.width, board.height, bytes(board.cells), board.weights.tobytes(),
+        board.vacating)
+
+def unpackBoard(packed):
+    width, height, cells, weights, vacating = packed
+    board = Board(width, height)
+    board.cells[:] = cells
+    board.weights = array("i")
+    board.weights.frombytes(weights)
+    board.setFree(dict((i, turn) for turn, i in vacating))
+    return board
+
+def evaluate(packed, data, deadline):
+    """works out a move in a worker process
+
+    Arguments:\n
+        packed {tuple} -- the weighted board from packBoard()
+        data {dict} -- the game data
+        deadline {float} -- time.perf_counter() value the move is due by,
+            perf_counter is the same clock in every process so a job that
+            sat in the queue past it is dropped straight away
+
+    Returns:
+        tuple -- (direction, counts) direction is None if it ran out of
+            time, counts are the engines counters for the server to merge
+    """
+    if time.perf_counter() >= deadline:
+        return None, None
+    main = importlib.import_module("main")
+    from api import MOVE_NAMES
+    engine = main.Engine(data, unpackBoard(packed), deadline=deadline)
+    try:
+        direction = MOVE_NAMES[main.decideMove(engine).body]
+    except main.OutOfTime:
+        direction = None
+    return direction, engine.metrics.drain()
+
+def offloadMove(board, data, deadline):
+    """has a worker process decide the move and waits for it until the
+    deadline
+
+    Arguments:\n
+        board {Board} -- the weighted board
+        data {dict} -- the game data
+        deadline {float} -- time.perf_counter() value to be done by
+
+    Returns:
+        tuple -- (direction, counts) like evaluate(), (None, None) if
+            there was no answer in time
+    """
+    budget = deadline - time.perf_counter()
+    if budget <= 0:
+        return None, None
+    try:
+        future = _pool.submit(evaluate, packBoard(board), data, deadline)
+        return future.result(timeout=budget)
+    except TimeoutError:
+        future.cancel()#if it hasnt started, evaluate() drops it if it has
+        return None, None
+    except BrokenProcessPool:#a worker died, start over
+        stopPool()
+        startPool()
+        return None, None
@@ -0,0 +1,206 @@
+"""
+food routes that are kept from one turn to the next instead of running
+makeDijk from scratch every move.
+
+every food has its own shortest path tree grown backwards from it, so
+it doesnt matter where the head is: dist[v] is what it costs to get
+from v to the food and nxt[v] is the square to go to next. going into
+a square costs its weight like in makeDijk, so
+dist[v] = weights[nxt[v]] + dist[nxt[v]].
+
+each turn the squares whose weight or whether they can be gone through
+changed are found, everything whose path went through one of them is
+thrown out and searched again from the edge of what is left. if more
+than REBUILD_FRACTION of the board changed the trees are rebuilt.
+
+turned on with FOOD_ROUTES=incremental. unlike makeDijk, body squares
+are never gone through since when they empty out depends on how far
+the head is from them, and paths that cost the same can come out
+different.
+"""
+import heapq
+import os
+from array import array
+
+from board import SELF
+
+INCREMENTAL = os.getenv('FOOD_ROUTES', 'full') == 'incremental'
+REBUILD_FRACTION = float(os.getenv('ROUTE_REBUILD', 0.25))
+
+UNREACHED = 2**31-1
+PASSABLE = bytes(1 if identity < SELF else 0 for identity in range(256))#cells.translate table
+
+class FoodTree(object):
+    """the cheapest way from every square to one food"""
+    __slots__ = ("food", "dist", "nxt")
+
+    def __init__(self, food, size):
+        self.food = food
+        self.dist = array("i", [UNREACHED])*size
+        self.nxt = array("i", [-1])*size
+
+    def build(self, board, passable):
+        """works the whole tree out from scratch
+
+        Returns:
+            int -- how many squares were settled
+        """
+        dist = self.dist
+        nxt = self.nxt
+        for i in range(board.size):
+            dist[i] = UNREACHED
+            nxt[i] = -1
+        dist[self.food] = 0
+        return self._grow(board, passable, [(0, self.food)])
+
+    def repair(self, board, passable, changed):
+        """fixes the tree after some squares changed
+
+        Arguments:\n
+            board {Board} -- the board as it is now
+            passable {bytearray} -- 1 for every square that can be gone through
+            changed {list of ints} -- squares whose weight or passable changed
+
+        Returns:
+            int -- how many squares were settled again
+        """
+        dist = self.dist
+        nxt = self.nxt
+        neighbours = board.neighbours
+        food = self.food
+
+        #everything whose path goes into a changed square, and the square
+        #itself if it cant be gone through any more
+        lost = []
+        stack = []
+        for i in changed:
+            if i != food and not passable[i] and dist[i] != UNREACHED:
+                dist[i] = UNREACHED
+                nxt[i] = -1
+                lost.append(i)
+            stack.append(i)
+        while stack:
+            i = stack.pop()
+            for adj in neighbours[i]:
+                if nxt[adj] == i:
+                    dist[adj] = UNREACHED
+                    nxt[adj] = -1
+                    lost.append(adj)
+                    stack.append(adj)
+
+        #start again from everything still known next to what was lost or changed,
+        #changed squares can also make paths cheaper for their neighbours
+        heap = []
+        for group in (lost, changed):
+            for i in group:
+                if dist[i] != UNREACHED:
+                    heap.append((dist[i], i))
+                for adj in neighbours[i]:
+                    if dist[adj] != UNREACHED:
+                        heap.append((dist[adj], adj))
+        heapq.heapify(heap)
+        return self._grow(board, passable, heap)
+
+    def _grow(self, board, passable, heap):
+        dist = self.dist
+        nxt = self.nxt
+        weights = board.weights
+        neighbours = board.neighbours
+        settled = 0
+        while heap:
+            d, i = heapq.heappop(heap)
+            if d != dist[i]:#stale entry
+                continue
+            settled += 1
+            d += weights[i]#what it costs to come into i
+            for adj in neighbours[i]:
+                if passable[adj] and d < dist[adj]:
+                    dist[adj] = d
+                    nxt[adj] = i
+                    heapq.heappush(heap, (d, adj))
+        return settled
+
+    def path(self, board, start):
+        """the cheapest path from start to the food
+
+        Returns:
+            list -- the cost followed by x,y coordinates like getFoodPaths,
+                None if the food cant be reached
+        """
+        if start == self.food or self.dist[start] == UNREACHED:
+            return None
+        pos = board.pos
+        nxt = self.nxt
+        path = [self.dist[start], pos(start)]
+        i = start
+        while i != self.food:
+            i = nxt[i]
+            path.append(pos(i))
+        return path
+
+class FoodRoutes(object):
+    """the food trees for one game, kept in its GameState"""
+    __slots__ = ("trees", "passable", "weights", "rebuilds", "repairs")
+
+    def __init__(self):
+        self.trees = {}#food cell:FoodTree
+        self.passable = None#what the trees were worked out on
+        self.weights = None
+        self.rebuilds = 0
+        self.repairs = 0
+
+    def update(self, board, foods):
+        """brings the trees up to date with the weighted board
+
+        Arguments:\n
+            board {Board} -- the board this turn, after makeWeightedAdj
+            foods {list of ints} -- the food cells
+
+        Returns:
+            int -- how many squares were settled
+        """
+        size = board.size
+        weights = board.weights
+        passable = board.cells.translate(PASSABLE)
+        oldPassable = self.passable
+        if oldPassable is None or len(oldPassable) != size:
+            changed = None
+        else:
+            oldWeights = self.weights
+            changed = [i for i in range(size)
+                if passable[i] != oldPassable[i] or weights[i] != oldWeights[i]]
+            if len(changed) > REBUILD_FRACTION*size:
+                changed = None
+
+        trees = self.trees
+        wanted = set(foods)
+        for food in list(trees):
+            if food not in wanted:
+                del trees[food]
+        settled = 0
+        for food in foods:
+            tree = trees.get(food)
+            if tree is None or changed is None:
+                if tree is None:
+                    tree = trees[food] = FoodTree(food, size)
+                settled += tree.build(board, passable)
+            elif changed:
+                settled += tree.repair(board, passable, changed)
+        if changed is None:
+            self.rebuilds += 1
+        else:
+            self.repairs += 1
+        self.passable = passable
+        self.weights = array("i", weights)
+        return settled
+
+    def paths(self, board, start):
+        """every reachable foods cheapest path from start, cheapest first,
+        the same form getFoodPaths gives back
+        """
+        allPaths = []
+        for tree in self.trees.values():
+            path = tree.path(board, start)
+            if path is not None:
+                allPaths.append(path)
+        return sorted(allPaths, key=lambda path:path[0])
@@ -0,0 +1,405 @@
+import heapq
+import random
+import time
+from array import array
+from collections import deque
+
+from board import SELF
+
+WEIGHT_START = 50
+
+def dangerLevels(start):
+    """how dangerous a square is for every step away from an enemy head,
+    each step is the last one //1.5, stops once it is no worse than an
+    empty square
+
+    Arguments:\n
+        start {int} -- the weight of the head itself
+
+    Returns:
+        tuple of ints -- the weight at distance 0, 1, 2...
+    """
+    levels = []
+    level = start
+    while level > 1:
+        levels.append(level)
+        level = level*2//3 #same as //1.5
+    return tuple(levels)
+
+DANGER_LEVELS = dangerLevels(WEIGHT_START)
+
+def dangerField(board, heads, levels=DANGER_LEVELS):
+    """weights every square by how close it is to an enemy head,
+    all heads are spread out from together one layer at a time so the
+    board is only walked once no matter how many snakes there are.
+    a square gets the level of its closest head, plus 1 if two different
+    heads are tied for closest
+
+    Arguments:\n
+        board {Board} -- the board, its weights are raised in place
+        heads {list of ints} -- cell indices of the enemy heads
+
+    Keyword Arguments:\n
+        levels {tuple} -- weight at each distance (default: {DANGER_LEVELS})
+
+    Returns:
+        array -- board.weights
+    """
+    cells = board.cells
+    weights = board.weights
+    neighbours = board.neighbours
+    owner = array("i", [-1])*board.size
+    contested = bytearray(board.size)
+
+    frontier = []
+    for snake, head in enumerate(heads):
+        owner[head] = snake
+        frontier.append(head)
+
+    for dist, level in enumerate(levels):
+        for i in frontier:
+            danger = level + contested[i]
+            if weights[i] < danger:
+                weights[i] = danger
+        if dist == len(levels)-1:
+            break
+
+        layer = set()
+        nextFrontier = []
+        for i in frontier:
+            snake = owner[i]
+            for adj in neighbours[i]:
+                if cells[adj] >= SELF:
+                    continue
+                if owner[adj] == -1:
+                    owner[adj] = snake
+                    contested[adj] = contested[i]
+                    layer.add(adj)
+                    nextFrontier.append(adj)
+                elif adj in layer and (owner[adj] != snake or contested[i]):
+                    contested[adj] = 1#as close to more than one head
+        frontier = nextFrontier
+    return weights
+
+class DistanceField(object):
+    """breadth first distances from one square to everything reachable,
+    found with a single search so that any number of questions about
+    the board can be answered without searching again.
+
+    Paths come back as lists of x,y tuples starting at the origin,
+    or -1 if there is no path.
+    a body square is reached once the search gets there no sooner than
+    board.free says it empties out, so paths can follow a tail in.
+    """
+    __slots__ = ("board", "origin", "dist", "parents", "firstOf", "found")
+
+    def __init__(self, board, currPos):
+        """
+        Arguments:\n
+            board {Board} -- the board to search
+            currPos {tuple} -- the x,y coordinates to search from
+        """
+        cells = board.cells
+        free = board.free
+        neighbours = board.neighbours
+        size = board.size
+        start = board.index(currPos)
+
+        dist = array("i", [-1])*size
+        parents = array("i", [-1])*size
+        firstOf = {}#identity:first cell found with it
+
+        dist[start] = 0
+        found = 1
+        visitQueue = deque([start])
+        while visitQueue:
+            baseKey = visitQueue.popleft()
+            nextDist = dist[baseKey]+1
+            for adjNode in neighbours[baseKey]:
+                if dist[adjNode] != -1 or (cells[adjNode] >= SELF and not 0 < free[adjNode] <= nextDist):
+                    continue
+                dist[adjNode] = nextDist
+                parents[adjNode] = baseKey
+                found += 1
+                identity = cells[adjNode]
+                if identity not in firstOf:
+                    firstOf[identity] = adjNode
+                visitQueue.append(adjNode)
+
+        self.board = board
+        self.origin = start
+        self.dist = dist
+        self.parents = parents
+        self.firstOf = firstOf
+        self.found = found#how many squares can be reached, origin included
+
+    def _retrace(self, i):
+        parents = self.parents
+        pos = self.board.pos
+        path = [pos(i)]
+        while i != self.origin:
+            i = parents[i]
+            path.append(pos(i))
+        path.reverse()
+        return path
+
+    def pathTo(self, pos):
+        """shortest path to x,y coordinates
+
+        Arguments:\n
+            pos {tuple} -- the x,y coordinates of the target
+
+        Returns:
+            list of tuples or int -- the path, -1 if there is none
+        """
+        i = self.board.index(pos)
+        if i is None or self.dist[i] == -1:
+            return -1
+        return self._retrace(i)
+
+    def nearest(self, identity):
+        """shortest path to the closest square with a given identity,
+        not counting the origin
+
+        Arguments:\n
+            identity {int} -- what to look for, see top of board.py
+
+        Returns:
+            list of tuples or int -- the path, -1 if there is none
+        """
+        i = self.firstOf.get(identity)
+        if i is None:
+            return -1
+        return self._retrace(i)
+
+    def nearestOf(self, positions):
+        """shortest path to the closest of a group of squares, ties go to
+        the one listed first
+
+        Arguments:\n
+            positions {iterable of tuples} -- x,y coordinates to choose from
+
+        Returns:
+            list of tuples or int -- the path, -1 if none can be reached
+        """
+        index = self.board.index
+        return self.nearestCell(index(pos) for pos in positions)
+
+    def nearestCell(self, cells):
+        """nearestOf() for cell indices, None is skipped like a square off
+        the board
+        """
+        dist = self.dist
+        best = None
+        for i in cells:
+            if i is None or dist[i] == -1:
+                continue
+            if best is None or dist[i] < dist[best]:
+                best = i
+        if best is None:
+            return -1
+        return self._retrace(best)
+
+def aStar(board, start, goal, stats=None):
+    """shortest path between two squares, searched towards the goal with
+    the manhattan distance so an open board isnt covered the way a
+    breadth first search would. body squares are let in once they are
+    free like in DistanceField. when squares look as good as each other
+    the one closer to the goal goes first, then the lowest cell index,
+    so the same board always gives the same path
+
+    Arguments:\n
+        board {Board} -- the board
+        start {int} -- the cell to start at
+        goal {int} -- the cell to get to
+
+    Keyword Arguments:\n
+        stats {dict} -- if given how many squares were expanded is
+            counted in it (default: {None})
+
+    Returns:
+        list of tuples or int -- the x,y coordinates from start to goal,
+            -1 if it cant be reached
+    """
+    cells = board.cells
+    free = board.free
+    neighbours = board.neighbours
+    topology = board.topology
+    xs = topology.xs
+    ys = topology.ys
+    goalX = xs[goal]
+    goalY = ys[goal]
+
+    dist = {start:0}
+    parents = {}
+    closed = set()
+    startH = abs(xs[start]-goalX) + abs(ys[start]-goalY)
+    heap = [(startH, startH, start)]
+    expanded = 0
+    found = start == goal
+    while heap and not found:
+        _, _, curr = heapq.heappop(heap)
+        if curr in closed:#stale entry
+            continue
+        closed.add(curr)
+        expanded += 1
+        arrival = dist[curr]+1
+        for adj in neighbours[curr]:
+            if adj in closed or (cells[adj] >= SELF and not 0 < free[adj] <= arrival):
+                continue
+            if arrival < dist.get(adj, arrival+1):
+                dist[adj] = arrival
+                parents[adj] = curr
+                if adj == goal:
+                    found = True
+                    break
+                h = abs(xs[adj]-goalX) + abs(ys[adj]-goalY)
+                heapq.heappush(heap, (arrival+h, h, adj))
+
+    if stats is not None:
+        stats["expanded"] = stats.get("expanded", 0) + expanded
+    if not found:
+        return -1
+    pos = board.pos
+    path = [pos(goal)]
+    i = goal
+    while i != start:
+        i = parents[i]
+        path.append(pos(i))
+    path.reverse()
+    return path
+
+def longestPath(board, start, target=None, deadline=None, iterations=None, limit=None,
+        stats=None, rng=None):
+    """finds a decently long path from start by taking random walks that
+    end once they run out of unvisited squares or reach the target,
+    keeps going until out of time and gives back the longest walk
+
+    Arguments:\n
+        board {Board} -- the board
+        start {int} -- the cell index to start from
+
+    Keyword Arguments:\n
+        target {int} -- cell index that ends a walk early (default: {None})
+        deadline {float} -- time.perf_counter() value to stop at (default: {None})
+        iterations {int} -- most walks to take, one walk if neither this
+            nor deadline is given (default: {None})
+        limit {int} -- stops once a walk is this long, such as when it covers
+            every reachable square (default: {None})
+        stats {dict} -- if given walks and steps are counted in it (default: {None})
+        rng {Random} -- where the walks get their random numbers from,
+            the random module if None (default: {None})
+
+    Returns:
+        list of ints -- the longest walk found, starting at start
+    """
+    cells = board.cells
+    neighbours = board.neighbours
+    choice = (random if rng is None else rng).choice
+    clock = time.perf_counter
+    if deadline is None and iterations is None:
+        iterations = 1
+
+    best = [start]
+    walks = 0
+    steps = 0
+    while True:
+        path = [start]
+        visited = 1 << start#bit i is set once cell i is on the path
+        curr = start
+        while curr != target:
+            options = [adj for adj in neighbours[curr]
+                if cells[adj] < SELF and not visited >> adj & 1]
+            if not options:#dead end
+                break
+            curr = choice(options)
+            visited |= 1 << curr
+            path.append(curr)
+
+        if len(path) > len(best):
+            best = path
+        walks += 1
+        steps += len(path)
+        if limit is not None and len(best) >= limit:
+            break
+        if iterations is not None and walks >= iterations:
+            break
+        if deadline is not None and clock() >= deadline:
+            break
+    if stats is not None:
+        stats["walks"] = walks
+        stats["steps"] = steps
+    return best
+
+class Territory(object):
+    """splits the board between snakes, every square belongs to whichever
+    snake can get there first. all snakes are spread out from together in
+    one breadth first search. if more than one snake can get somewhere
+    first the longest one gets it, if they are the same length nobody does.
+
+    owner is the snakes number (place in seeds) for every square,
+    -1 if nobody gets it, dist is how far away the owner is and sizes is
+    how many squares every snake owns.
+    """
+    __slots__ = ("owner", "dist", "sizes")
+
+    def __init__(self, board, seeds):
+        """
+        Arguments:\n
+            board {Board} -- the board to split up
+            seeds {list of tuples} -- (cell index, starting distance, length)
+                for every snake, a starting distance of 1 means the snake
+                has already used up a move getting there
+        """
+        cells = board.cells
+        neighbours = board.neighbours
+        owner = array("i", [-1])*board.size
+        dist = array("i", [-1])*board.size
+        strength = array("i", [0])*board.size
+        sizes = [0]*len(seeds)
+
+        pending = {}#starting distance:seeds that start then
+        for snake, (cell, start, length) in enumerate(seeds):
+            dist[cell] = start
+            owner[cell] = snake
+            strength[cell] = length
+            pending.setdefault(start, []).append(cell)
+
+        frontier = []
+        layer = min(pending) if pending else 0
+        while frontier or pending:
+            for cell in pending.pop(layer, ()):
+                if owner[cell] != -1:
+                    sizes[owner[cell]] += 1
+                frontier.append(cell)
+
+            nextDist = layer+1
+            nextFrontier = []
+            for i in frontier:
+                claim = owner[i]
+                power = strength[i]
+                for adj in neighbours[i]:
+                    if cells[adj] >= SELF:
+                        continue
+                    d = dist[adj]
+                    if d == -1:
+                        dist[adj] = nextDist
+                        owner[adj] = claim
+                        strength[adj] = power
+                        nextFrontier.append(adj)
+                    elif d == nextDist:#another snake got here just as fast
+                        if power > strength[adj]:
+                            owner[adj] = claim
+                            strength[adj] = power
+                        elif power == strength[adj] and owner[adj] != claim:
+                            owner[adj] = -1
+
+            for adj in nextFrontier:#claims are settled once the layer is done
+                if owner[adj] != -1:
+                    sizes[owner[adj]] += 1
+            frontier = nextFrontier
+            layer = nextDist
+
+        self.owner = owner
+        self.dist = dist
+        self.sizes = sizes
@@ -0,0 +1,264 @@
+from array import array
+from collections import deque
+
+from topology import topology
+from zobrist import HEALTH_BUCKET, zobristKeys
+
+#the order moves are numbered in, same as the neighbour tables
+DIRECTIONS = ("left", "up", "right", "down")
+MAX_HEALTH = 100
+
+class Simulator(object):
+    """the whole game, every snake, its health and the food, kept small
+    enough that turns can be played forward with make() and taken back
+    with unmake() without copying anything.
+
+    bodies are deques of cell indices, head first. occupied counts the
+    body segments on every cell, so a snake that just ate and has its
+    tail doubled up counts twice. snakes that die keep their body in
+    bodies but are taken off occupied.
+
+    hash is the zobrist hash of the position, kept up to date by make()
+    and unmake(): which squares are taken, the food, and every living
+    snakes head, length and health (in steps of HEALTH_BUCKET).
+    """
+    __slots__ = ("width", "height", "size", "steps", "bodies", "health",
+        "alive", "food", "occupied", "turn", "keys", "hash")
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.size = width*height
+        self.steps = topology(width, height).steps
+        self.bodies = []
+        self.health = []
+        self.alive = []
+        self.food = bytearray(self.size)
+        self.occupied = array("i", [0])*self.size
+        self.turn = 0
+        self.keys = zobristKeys(width, height)
+        self.hash = 0
+
+    @classmethod
+    def fromData(cls, data):
+        """builds the game in a /move request, our snake is snake 0
+
+        Arguments:\n
+            data {dict} -- the game data
+
+        Returns:
+            Simulator -- the game as it is now
+        """
+        board = data["board"]
+        width = board["width"]
+        sim = cls(width, board["height"])
+        sim.turn = data.get("turn", 0)
+        myId = data["you"]["id"]
+        snakes = sorted(board["snakes"], key=lambda snake: snake["id"] != myId)
+        for snake in snakes:
+            sim.addSnake([part["y"]*width + part["x"] for part in snake["body"]], snake["health"])
+        for meal in board["food"]:
+            sim.addFood(meal["y"]*width + meal["x"])
+        return sim
+
+    def addFood(self, cell):
+        if not self.food[cell]:
+            self.food[cell] = 1
+            self.hash ^= self.keys.food[cell]
+
+    def addSnake(self, body, health=MAX_HEALTH):
+        """puts a snake on the board
+
+        Arguments:\n
+            body {list of ints} -- cell indices, head first
+
+        Returns:
+            int -- the snakes number
+        """
+        snake = len(self.bodies)
+        keys = self.keys
+        keys.snake(snake)
+        occupied = self.occupied
+        for cell in body:
+            if not occupied[cell]:
+                self.hash ^= keys.occupied[cell]
+            occupied[cell] += 1
+        self.hash ^= (keys.heads[snake][body[0]] ^ keys.lengths[snake][len(body)]
+            ^ keys.health[snake][health//HEALTH_BUCKET])
+        self.bodies.append(deque(body))
+        self.health.append(health)
+        self.alive.append(True)
+        return snake
+
+    def moves(self, snake):
+        """the directions a snake can go without leaving the board or
+        turning back into its own neck
+
+        Returns:
+            list of ints -- directions, see DIRECTIONS
+        """
+        body = self.bodies[snake]
+        head = body[0]
+        neck = body[1] if len(body) > 1 else -1
+        steps = self.steps
+        return [d for d in range(4) if steps[head*4+d] not in (-1, neck)]
+
+    def make(self, moves):
+        """plays one turn, every living snake moves at once then eating,
+        starving and collisions are worked out the same way the engine does
+
+        Arguments:\n
+            moves {list of ints} -- a direction for every snake, dead ones are ignored
+
+        Returns:
+            tuple -- what unmake() needs to take the turn back
+        """
+        bodies = self.bodies
+        health = self.health
+        alive = self.alive
+        food = self.food
+        occupied = self.occupied
+        steps = self.steps
+        keys = self.keys
+        occupiedKeys = keys.occupied
+        oldHash = hashed = self.hash
+
+        moved = []#[snake, tail that moved off, health before, ate, new head]
+        for snake, body in enumerate(bodies):
+            if not alive[snake]:
+                continue
+            heads = keys.heads[snake]
+            newHead = steps[body[0]*4 + moves[snake]]
+            hashed ^= heads[body[0]] ^ keys.health[snake][health[snake]//HEALTH_BUCKET]
+            tail = body.pop()
+            occupied[tail] -= 1
+            if not occupied[tail]:
+                hashed ^= occupiedKeys[tail]
+            if newHead != -1:
+                body.appendleft(newHead)
+                if not occupied[newHead]:
+                    hashed ^= occupiedKeys[newHead]
+                occupied[newHead] += 1
+            if body:#off the board leaves the neck in front until it is removed
+                hashed ^= heads[body[0]]
+            moved.append([snake, tail, health[snake], False, newHead])
+            health[snake] -= 1
+
+        eaten = []
+        for entry in moved:
+            snake, tail, _, _, newHead = entry
+            if newHead != -1 and food[newHead]:
+                body = bodies[snake]
+                health[snake] = MAX_HEALTH
+                lengths = keys.lengths[snake]
+                hashed ^= lengths[len(body)] ^ lengths[len(body)+1]
+                body.append(body[-1])#grows next turn
+                occupied[body[-1]] += 1
+                entry[3] = True
+                if newHead not in eaten:
+                    eaten.append(newHead)
+        for cell in eaten:
+            food[cell] = 0
+            hashed ^= keys.food[cell]
+        for snake, _, _, _, _ in moved:
+            hashed ^= keys.health[snake][max(health[snake], 0)//HEALTH_BUCKET]
+        self.hash = hashed
+
+        died = []
+        for snake, _, _, _, newHead in moved:
+            if newHead == -1 or health[snake] <= 0:#off the board or starved
+                died.append(snake)
+        self._remove(died)
+
+        heads = {}#cell:snakes with their head there
+        for snake, _, _, _, newHead in moved:
+            if alive[snake]:
+                heads.setdefault(newHead, []).append(snake)
+        collided = []
+        for newHead, others in heads.items():
+            if occupied[newHead] > len(others):#ran into a body
+                collided.extend(others)
+                continue
+            for snake in others:
+                length = len(bodies[snake])
+                for other in others:
+                    if other != snake and len(bodies[other]) >= length:#lost head to head
+                        collided.append(snake)
+                        break
+        self._remove(collided)
+        died.extend(collided)
+
+        self.turn += 1
+        return (moved, eaten, died, oldHash)
+
+    def _remove(self, snakes):
+        occupied = self.occupied
+        keys = self.keys
+        hashed = self.hash
+        for snake in snakes:
+            self.alive[snake] = False
+            body = self.bodies[snake]
+            hashed ^= (keys.lengths[snake][len(body)]
+                ^ keys.health[snake][max(self.health[snake], 0)//HEALTH_BUCKET])
+            if body:
+                hashed ^= keys.heads[snake][body[0]]
+            for cell in body:
+                occupied[cell] -= 1
+                if not occupied[cell]:
+                    hashed ^= keys.occupied[cell]
+        self.hash = hashed
+
+    def unmake(self, undo):
+        """takes back a turn played with make()
+
+        Arguments:\n
+            undo {tuple} -- what make() gave back, turns have to be taken
+                back newest first
+        """
+        moved, eaten, died, oldHash = undo
+        bodies = self.bodies
+        health = self.health
+        occupied = self.occupied
+
+        for snake in died:
+            self.alive[snake] = True
+            for cell in bodies[snake]:
+                occupied[cell] += 1
+        for cell in eaten:
+            self.food[cell] = 1
+        for snake, tail, oldHealth, ate, newHead in moved:
+            body = bodies[snake]
+            if ate:
+                occupied[body.pop()] -= 1
+            if newHead != -1:
+                body.popleft()
+                occupied[newHead] -= 1
+            body.append(tail)
+            occupied[tail] += 1
+            health[snake] = oldHealth
+        self.hash = oldHash
+        self.turn -= 1
+
+    def rehash(self):
+        """works the hash out from scratch, make() and unmake() keep it
+        up to date so this is only needed to check them
+
+        Returns:
+            int -- the hash
+        """
+        keys = self.keys
+        hashed = 0
+        for cell in range(self.size):
+            if self.occupied[cell]:
+                hashed ^= keys.occupied[cell]
+            if self.food[cell]:
+                hashed ^= keys.food[cell]
+        for snake, body in enumerate(self.bodies):
+            if self.alive[snake]:
+                hashed ^= (keys.heads[snake][body[0]] ^ keys.lengths[snake][len(body)]
+                    ^ keys.health[snake][self.health[snake]//HEALTH_BUCKET])
+        return hashed
+
+    def living(self):
+        """the numbers of the snakes still alive"""
+        return [snake for snake, isAlive in enumerate(self.alive) if isAlive]
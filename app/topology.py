@@ -0,0 +1,113 @@
+from array import array
+
+#the strike zone is the ring of squares two away from a head, the 5x5
+#square around it without the 3x3 middle. RING lists the offsets in the
+#order getCorners always has, column by column from the left
+RING = tuple((dx, dy) for dx in range(-2, 3) for dy in range(-2, 3)
+    if abs(dx) == 2 or abs(dy) == 2)
+RING_SLOTS = dict((offset, slot) for slot, offset in enumerate(RING))
+
+def _ringWalk():
+    """the ring offsets in the order rotating clockwise goes round them,
+    down the left side, along y=2, up the right side and back along y=-2
+    """
+    walk = [(-2, dy) for dy in range(-2, 2)]
+    walk += [(dx, 2) for dx in range(-2, 2)]
+    walk += [(2, dy) for dy in range(2, -2, -1)]
+    walk += [(dx, -2) for dx in range(2, -2, -1)]
+    return walk
+
+def _rotations():
+    walk = _ringWalk()
+    clockwise = [0]*len(RING)
+    counterclockwise = [0]*len(RING)
+    for i, offset in enumerate(walk):
+        slot = RING_SLOTS[offset]
+        clockwise[slot] = RING_SLOTS[walk[(i+1) % len(walk)]]
+        counterclockwise[slot] = RING_SLOTS[walk[i-1]]
+    return tuple(clockwise), tuple(counterclockwise)
+
+#the ring slot one step round from each ring slot
+CLOCKWISE, COUNTERCLOCKWISE = _rotations()
+
+_TOPOLOGIES = {}#(width, height):Topology
+
+class Topology(object):
+    """everything about a board that only depends on its size, worked
+    out once and shared by every game and board that size. nothing in
+    here is ever changed after it is made.
+
+    neighbours -- for cell i, the cells next to it in the order left, up,
+        right, down
+    steps -- entry i*4+direction is the cell moved to, -1 off the board
+    xs, ys -- the coordinates of every cell, for manhattan distances
+    rings -- for cell i, the strike zone cells around it that are on the
+        board, in RING order
+    notFirstColumn, notLastColumn -- bitboards (see bitboard.py) of every
+        cell but the ones at x=0 or x=width-1
+    """
+    __slots__ = ("width", "height", "size", "neighbours", "steps", "xs", "ys",
+        "rings", "notFirstColumn", "notLastColumn")
+
+    def __init__(self, width, height):
+        size = width*height
+        self.width = width
+        self.height = height
+        self.size = size
+        self.xs = array("i", (i % width for i in range(size)))
+        self.ys = array("i", (i // width for i in range(size)))
+
+        neighbours = []
+        steps = array("i", [-1])*(size*4)
+        for y in range(height):
+            for x in range(width):
+                i = y*width + x
+                adj = []
+                if x > 0:
+                    adj.append(i-1)
+                    steps[i*4] = i-1
+                if y > 0:
+                    adj.append(i-width)
+                    steps[i*4+1] = i-width
+                if x < width-1:
+                    adj.append(i+1)
+                    steps[i*4+2] = i+1
+                if y < height-1:
+                    adj.append(i+width)
+                    steps[i*4+3] = i+width
+                neighbours.append(tuple(adj))
+        self.neighbours = tuple(neighbours)
+        self.steps = steps
+
+        rings = []
+        for y in range(height):
+            for x in range(width):
+                rings.append(tuple((y+dy)*width + x+dx for dx, dy in RING
+                    if 0 <= x+dx < width and 0 <= y+dy < height))
+        self.rings = tuple(rings)
+
+        #strings are highest bit first so a row reads from x=width-1 down
+        self.notFirstColumn = int(("1"*(width-1) + "0")*height, 2)
+        self.notLastColumn = int(("0" + "1"*(width-1))*height, 2)
+
+    def distance(self, a, b):
+        """manhattan distance between two cells"""
+        xs = self.xs
+        ys = self.ys
+        return abs(xs[a]-xs[b]) + abs(ys[a]-ys[b])
+
+def topology(width, height):
+    """the tables for a board size, made the first time it is asked for
+
+    Arguments:\n
+        width {int} -- the width of the board
+        height {int} -- the height of the board
+
+    Returns:
+        Topology -- shared, dont change it
+    """
+    key = (width, height)
+    tables = _TOPOLOGIES.get(key)
+    if tables is None:
+        tables = _TOPOLOGIES[key] = Topology(width, height)
+    return tables
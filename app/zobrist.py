@@ -0,0 +1,121 @@
+import os
+import random
+
+#keys come from a fixed seed so every process, and every run, hashes
+#the same position to the same number
+ZOBRIST_SEED = 0x5eed
+HEALTH_BUCKET = 10#health is hashed in steps of this much
+TABLE_SIZE = int(os.getenv('TABLE_SIZE', 4096))#entries in each games table
+
+_KEYS = {}#(width, height):ZobristKeys
+
+def randomKeys(rand, count):
+    return [rand.getrandbits(64) for _ in range(count)]
+
+class ZobristKeys(object):
+    """the random numbers positions on a board of one size are hashed with,
+    shared by every game of that size
+
+    cells has one key for every identity on every cell (see top of
+    board.py), empty squares hash to 0. occupied, food and heads are for
+    Simulator, heads, lengths and health get a list per snake as they
+    are first asked for.
+    """
+    __slots__ = ("width", "height", "size", "rand", "cells", "occupied", "food",
+        "heads", "lengths", "health")
+
+    def __init__(self, width, height):
+        size = width*height
+        self.width = width
+        self.height = height
+        self.size = size
+        self.rand = random.Random("%d-%d-%d" % (ZOBRIST_SEED, width, height))
+        self.cells = randomKeys(self.rand, size*6)
+        for i in range(size):
+            self.cells[i*6] = 0#SPACE
+        self.occupied = randomKeys(self.rand, size)
+        self.food = randomKeys(self.rand, size)
+        self.heads = []
+        self.lengths = []
+        self.health = []
+
+    def snake(self, snake):
+        """makes sure there are keys for snake number snake"""
+        while len(self.heads) <= snake:
+            self.heads.append(randomKeys(self.rand, self.size))
+            self.lengths.append(randomKeys(self.rand, self.size+1))
+            self.health.append(randomKeys(self.rand, 100//HEALTH_BUCKET+1))
+
+def zobristKeys(width, height):
+    """the keys for a board size, made the first time it is asked for"""
+    key = (width, height)
+    keys = _KEYS.get(key)
+    if keys is None:
+        keys = _KEYS[key] = ZobristKeys(width, height)
+    return keys
+
+class TranspositionTable(object):
+    """remembers what searches worked out about positions by their
+    zobrist hash, so a position reached again by another route or on
+    another turn isnt searched again.
+
+    it has a fixed number of slots and a hash always goes in the same one.
+    a new entry replaces one from an older generation (see newGeneration)
+    or one searched no deeper than it, otherwise the old one is kept.
+    """
+    __slots__ = ("capacity", "hashes", "values", "depths", "ages", "generation",
+        "hits", "misses", "stores", "replaced")
+
+    def __init__(self, capacity=TABLE_SIZE):
+        self.capacity = capacity
+        self.hashes = [None]*capacity
+        self.values = [None]*capacity
+        self.depths = [0]*capacity
+        self.ages = [0]*capacity
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.replaced = 0
+
+    def get(self, key, depth=0):
+        """the value stored for a position
+
+        Arguments:\n
+            key {int} -- the positions hash
+
+        Keyword Arguments:\n
+            depth {int} -- how deep the search needs it looked at (default: {0})
+
+        Returns:
+            the value, None if it isnt there or wasnt searched deep enough
+        """
+        slot = key % self.capacity
+        if self.hashes[slot] == key and self.depths[slot] >= depth:
+            self.hits += 1
+            self.ages[slot] = self.generation
+            return self.values[slot]
+        self.misses += 1
+        return None
+
+    def put(self, key, value, depth=0):
+        """stores a value for a position, see the class for when it replaces another"""
+        slot = key % self.capacity
+        old = self.hashes[slot]
+        if old is not None and old != key:
+            if self.ages[slot] == self.generation and self.depths[slot] > depth:
+                return
+            self.replaced += 1
+        self.hashes[slot] = key
+        self.values[slot] = value
+        self.depths[slot] = depth
+        self.ages[slot] = self.generation
+        self.stores += 1
+
+    def newGeneration(self):
+        """marks everything stored so far as old, called once a turn"""
+        self.generation += 1
+
+    def hitRate(self):
+        lookups = self.hits + self.misses
+        return self.hits/lookups if lookups else 0.0
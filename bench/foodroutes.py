@@ -0,0 +1,92 @@
+"""compares keeping food routes between turns (app/routes.py) with
+running makeDijk every turn, over games played out from every payload
+in bench/corpus with app/simulator.py
+
+python bench/foodroutes.py               every case
+python bench/foodroutes.py --only huge   just the cases with huge in the name
+
+every snake moves at random onto squares that are empty now, so turns look
+like real ones to the routes: heads move, tails follow and food gets
+eaten. both ways are timed on the same weighted board each turn and
+the paths they find are checked to cost the same.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "app"))
+
+import main
+from replay import loadCorpus
+from routes import FoodRoutes
+from simulator import Simulator
+
+def payload(sim, data):
+    """the /move payload for where the simulator is, our snake is snake 0"""
+    width = sim.width
+    snakes = []
+    for snake in sim.living():
+        old = data["board"]["snakes"][snake]
+        snakes.append({"id": old["id"], "health": sim.health[snake],
+            "body": [{"x": i % width, "y": i // width} for i in sim.bodies[snake]]})
+    return {"game": data.get("game", {}), "turn": sim.turn, "you": snakes[0],
+        "board": {"width": width, "height": sim.height, "snakes": snakes,
+            "food": [{"x": i % width, "y": i // width} for i in range(sim.size) if sim.food[i]]}}
+
+def play(data, turns, rand):
+    """plays a game out from a payload
+
+    Returns:
+        tuple -- (seconds for makeDijk, seconds for routes, turns, paths that cost different)
+    """
+    myId = data["you"]["id"]
+    data["board"]["snakes"].sort(key=lambda snake: snake["id"] != myId)
+    sim = Simulator.fromData(data)
+    routes = FoodRoutes()
+    full = kept = 0.0
+    played = differ = 0
+    clock = time.perf_counter
+    while played < turns and sim.alive[0]:
+        turn = payload(sim, data)
+        board = main.makeBoard(turn)
+        main.makeWeightedAdj(board, turn)
+        currPos = main.headPos(turn)
+        foods = main.foodCells(board, turn)
+
+        started = clock()
+        fullPaths = main.getFoodPaths(main.makeDijk(board, currPos, foods), board, turn, currPos)
+        full += clock()-started
+        started = clock()
+        routes.update(board, foods)
+        keptPaths = routes.paths(board, board.index(currPos))
+        kept += clock()-started
+        if [path[0] for path in fullPaths] != [path[0] for path in keptPaths]:
+            differ += 1
+
+        moves = []
+        for snake in range(len(sim.bodies)):
+            options = sim.moves(snake) or [0]
+            safe = [d for d in options if not sim.occupied[sim.steps[sim.bodies[snake][0]*4+d]]]
+            moves.append(rand.choice(safe or options))
+        sim.make(moves)
+        if rand.random() < 0.15:
+            empty = [i for i in range(sim.size) if not sim.occupied[i] and not sim.food[i]]
+            if empty:
+                sim.addFood(rand.choice(empty))
+        played += 1
+    return full, kept, played, differ
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=100)
+    parser.add_argument("--only", default=None)
+    args = parser.parse_args()
+
+    print("%-30s %6s %12s %12s %8s" % ("case", "turns", "makeDijk ms", "routes ms", "differ"))
+    for name, data in loadCorpus(args.only):
+        full, kept, played, differ = play(data, args.turns, random.Random(0))
+        if played:
+            print("%-30s %6d %12.3f %12.3f %8d" % (name, played, full*1000/played, kept*1000/played, differ))
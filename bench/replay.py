@@ -0,0 +1,216 @@
+"""replays /move payloads from bench/corpus through every stage of move()
+and times each one on its own
+
+python bench/replay.py                 compare against bench/baseline.json
+python bench/replay.py --save          write a new baseline
+python bench/replay.py --only stall    just the cases with stall in the name
+
+exits with 1 if a stages p50 got slower than the baseline by more than
+the tolerance, so it can be run before merging changes to the hot path.
+the baseline is only ever from this machine (it is not checked in), with
+none there is nothing to compare against and the timings are just shown.
+stages that end up in the longest path search run until STALL_BUDGET is
+used up, so they are timed but never compared.
+"""
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "app"))
+
+import main
+from search import DistanceField
+
+CORPUS = os.path.join(HERE, "corpus")
+BASELINE = os.path.join(HERE, "baseline.json")
+
+def loadCorpus(only=None):
+    """reads every payload in the corpus
+
+    Keyword Arguments:\n
+        only {str} -- only keep cases with this in their name (default: {None})
+
+    Returns:
+        list of tuples -- (name, payload) sorted by name
+    """
+    cases = []
+    for path in sorted(glob.glob(os.path.join(CORPUS, "*.json"))):
+        name = os.path.splitext(os.path.basename(path))[0]
+        if only and only not in name:
+            continue
+        with open(path) as f:
+            cases.append((name, json.load(f)))
+    return cases
+
+def stalls(branch, data, board):
+    """true if a branch of move() ends up in the longest path search,
+    which runs for however long it is given
+
+    Arguments:\n
+        branch {function} -- takes an Engine and picks a move
+        data {dict} -- a /move payload
+        board {Board} -- the weighted board
+
+    Returns:
+        boolean -- True if the branch is time budgeted
+    """
+    engine = main.Engine(data, board)
+    with contextlib.redirect_stdout(io.StringIO()):
+        branch(engine)
+    return any(search == "longestPath" for search, _ in engine.metrics.searches)
+
+def stages(data):
+    """the stages of move() with whatever each one needs already built,
+    none of them leave the board changed so they can share it
+
+    Arguments:\n
+        data {dict} -- a /move payload
+
+    Returns:
+        list of tuples -- (stage name, function to time, True if it is
+            time budgeted and shouldnt be compared)
+    """
+    currPos = main.headPos(data)
+
+    def weighted():
+        board = main.makeBoard(data)
+        main.makeWeightedAdj(board, data)
+        return board
+
+    board = weighted()
+    food = main.foodCells(board, data)
+    foodPaths = main.getFoodPaths(main.makeDijk(board, currPos, food), board, data, currPos)
+    field = DistanceField(board, currPos)
+    unweighted = main.makeBoard(data)
+
+    def engine():
+        return main.Engine(data, board, field)
+
+    def decide():
+        return main.decideMove(main.Engine(data, board))#works out only what it needs
+
+    def makeWeightedAdj():
+        unweighted.clearWeights()
+        main.makeWeightedAdj(unweighted, data)
+
+    return [
+        ("makeBoard", lambda: main.makeBoard(data), False),
+        ("makeWeightedAdj", makeWeightedAdj, False),
+        ("makeDijk", lambda: main.makeDijk(board, currPos, food), False),
+        ("distanceField", lambda: DistanceField(board, currPos), False),
+        ("safeMove", lambda: main.safeMove(board, currPos, data), False),
+        ("mealSpace", lambda: [main.mealSpace(board, path, data) for path in foodPaths], False),
+        ("determineBestMeal", lambda: main.determineBestMeal(engine(), foodPaths), False),
+        ("attackProtocol", lambda: main.attackProtocol(engine()),
+            stalls(main.attackProtocol, data, board)),
+        ("stallForTime", lambda: main.stallForTime(engine()), True),
+        ("decideMove", decide, stalls(main.decideMove, data, board)),
+    ]
+
+def percentile(sortedTimes, fraction):
+    return sortedTimes[min(len(sortedTimes)-1, int(fraction*len(sortedTimes)))]
+
+def measure(func, repeat):
+    """times a stage and measures what it allocates
+
+    Arguments:\n
+        func {function} -- the stage
+        repeat {int} -- how many times to time it
+
+    Returns:
+        dict -- p50 and p99 in milliseconds, peak kilobytes allocated
+    """
+    func()#warm up
+    times = []
+    clock = time.perf_counter
+    for _ in range(repeat):
+        started = clock()
+        func()
+        times.append((clock()-started)*1000)
+    times.sort()
+
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"p50": percentile(times, 0.5), "p99": percentile(times, 0.99), "kb": peak/1024.0}
+
+def run(cases, repeat):
+    results = {}
+    for name, data in cases:
+        for stage, func, budgeted in stages(data):
+            with contextlib.redirect_stdout(io.StringIO()):#stages print as they go
+                result = measure(func, repeat)
+            result["budgeted"] = budgeted
+            results["%s/%s" % (name, stage)] = result
+    return results
+
+def compare(results, baseline, tolerance, slack):
+    """finds stages that got slower than the baseline, time budgeted
+    stages are left out since they take as long as they are allowed to
+
+    Arguments:\n
+        tolerance {float} -- fraction slower that is allowed
+        slack {float} -- milliseconds slower that is always allowed,
+            so tiny stages dont fail on noise
+
+    Returns:
+        list of strings -- one line per stage that regressed
+    """
+    regressions = []
+    for key, result in sorted(results.items()):
+        if key not in baseline or result["budgeted"]:
+            continue
+        before = baseline[key]["p50"]
+        if result["p50"] > before*(1+tolerance) + slack:
+            regressions.append("%-45s p50 %8.3fms was %8.3fms" % (key, result["p50"], before))
+    return regressions
+
+def report(results, baseline):
+    print("%-45s %9s %9s %9s %9s" % ("case/stage", "p50 ms", "p99 ms", "peak kb", "vs base"))
+    for key, result in sorted(results.items()):
+        change = ""
+        if result["budgeted"]:
+            change = "budget"
+        elif key in baseline and baseline[key]["p50"] > 0:
+            change = "%+.0f%%" % ((result["p50"]/baseline[key]["p50"]-1)*100)
+        print("%-45s %9.3f %9.3f %9.1f %9s" % (key, result["p50"], result["p99"], result["kb"], change))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--only", default=None)
+    parser.add_argument("--save", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.5)
+    parser.add_argument("--slack", type=float, default=0.1)
+    args = parser.parse_args()
+
+    results = run(loadCorpus(args.only), args.repeat)
+    baseline = {}
+    if os.path.exists(BASELINE):
+        with open(BASELINE) as f:
+            baseline = json.load(f)
+    report(results, baseline)
+
+    if args.save:
+        baseline.update(results)
+        with open(BASELINE, "w") as f:
+            json.dump(baseline, f, indent=1, sort_keys=True)
+        print("saved", BASELINE)
+        sys.exit(0)
+
+    if not baseline:
+        print("\nno baseline to compare against, run with --save to record one")
+        sys.exit(0)
+    regressions = compare(results, baseline, args.tolerance, args.slack)
+    if regressions:
+        print("\nslower than baseline:")
+        print("\n".join(regressions))
+        sys.exit(1)
@@ -0,0 +1,98 @@
+"""times the searches a move runs on bigger and bigger boards, to see
+how each one grows with the number of squares
+
+python bench/scaling.py                 11x11 up to 100x100
+python bench/scaling.py --sizes 50 100  just those
+
+boards come from bench/synth.py with more snakes and food the bigger
+they are. a long path (head to the far corner) is timed with aStar and
+with app/hierarchy.py, and so is bringing the hierarchy up to date
+after one turn has been played with app/simulator.py.
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "app"))
+
+import main
+from foodroutes import payload
+from hierarchy import Hierarchy
+from search import DistanceField, aStar
+from simulator import Simulator
+from synth import randomGame
+
+def best(func, repeat):
+    """the quickest of repeat runs in ms, the least noisy for scaling"""
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        times.append(time.perf_counter()-started)
+    return min(times)*1000
+
+def farCell(board, head):
+    """the open square furthest from the head as the crow flies"""
+    distance = board.topology.distance
+    return max((i for i in range(board.size) if board.isOpen(i)), key=lambda i: distance(head, i))
+
+def nextTurn(data, rand):
+    """the payload after every snake makes a random move onto an empty square"""
+    sim = Simulator.fromData(data)
+    moves = []
+    for snake in range(len(sim.bodies)):
+        options = sim.moves(snake) or [0]
+        safe = [d for d in options if not sim.occupied[sim.steps[sim.bodies[snake][0]*4+d]]]
+        moves.append(rand.choice(safe or options))
+    sim.make(moves)
+    return payload(sim, data)
+
+def scale(size, repeat):
+    snakes = max(2, size*size//300)
+    data = randomGame(size, size, size, snakes, snakes*2, 120)
+    currPos = main.headPos(data)
+    board = main.makeBoard(data)
+    main.makeWeightedAdj(board, data)
+    head = board.index(currPos)
+    goal = farCell(board, head)
+    food = main.foodCells(board, data)
+
+    hierarchy = Hierarchy(size, size)
+    built = best(lambda: Hierarchy(size, size).update(board), repeat)
+    hierarchy.update(board)
+    after = main.makeBoard(nextTurn(data, random.Random(size)))
+    def update():
+        hierarchy.update(board)#back to this turn first
+        hierarchy.update(after)
+
+    def move():
+        with contextlib.redirect_stdout(io.StringIO()):
+            main.playMove(data, time.perf_counter())
+
+    return [
+        ("makeBoard", best(lambda: main.makeBoard(data), repeat)),
+        ("distanceField", best(lambda: DistanceField(board, currPos), repeat)),
+        ("makeDijk", best(lambda: main.makeDijk(board, currPos, food), repeat)),
+        ("aStar far", best(lambda: aStar(board, head, goal), repeat)),
+        ("hierarchy far", best(lambda: hierarchy.path(board, head, goal), repeat)),
+        ("hierarchy build", built),
+        ("hierarchy turn", best(update, repeat)/2),
+        ("playMove", best(move, repeat)),
+    ]
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[11, 19, 25, 50, 75, 100])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    results = [(size, scale(size, args.repeat)) for size in args.sizes]
+    stages = [stage for stage, _ in results[0][1]]
+    print("%-16s" % "ms" + "".join("%10s" % ("%dx%d" % (size, size)) for size, _ in results))
+    for n, stage in enumerate(stages):
+        print("%-16s" % stage + "".join("%10.3f" % timings[n][1] for _, timings in results))
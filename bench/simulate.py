@@ -0,0 +1,68 @@
+"""measures how many game states a second app/simulator.py can play
+forward and take back, starting from every payload in bench/corpus
+
+python bench/simulate.py               every case
+python bench/simulate.py --only huge   just the cases with huge in the name
+
+for scale it also times copying the /move payload with copy.deepcopy,
+which is what a search would have to do for every state without
+make/unmake
+"""
+import argparse
+import copy
+import os
+import random
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "app"))
+
+from replay import loadCorpus
+from simulator import Simulator
+
+def playouts(sim, seconds, depth, rand):
+    """plays random turns forward depth deep and takes them all back,
+    over and over until the time is up
+
+    Returns:
+        float -- states made a second
+    """
+    states = 0
+    clock = time.perf_counter
+    started = clock()
+    snakes = range(len(sim.bodies))
+    while clock()-started < seconds:
+        undos = []
+        for _ in range(depth):
+            if not sim.living():
+                break
+            moves = [rand.choice(sim.moves(snake) or (0,)) for snake in snakes]
+            undos.append(sim.make(moves))
+        for undo in reversed(undos):
+            sim.unmake(undo)
+        states += len(undos)
+    return states/(clock()-started)
+
+def copies(data, seconds):
+    """how many times a second the payload can be deepcopied"""
+    count = 0
+    clock = time.perf_counter
+    started = clock()
+    while clock()-started < seconds:
+        copy.deepcopy(data)
+        count += 1
+    return count/(clock()-started)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=0.5)
+    parser.add_argument("--depth", type=int, default=20)
+    parser.add_argument("--only", default=None)
+    args = parser.parse_args()
+
+    print("%-30s %14s %14s" % ("case", "states/s", "deepcopy/s"))
+    for name, data in loadCorpus(args.only):
+        sim = Simulator.fromData(data)
+        rate = playouts(sim, args.seconds, args.depth, random.Random(0))
+        print("%-30s %14.0f %14.0f" % (name, rate, copies(data, args.seconds)))
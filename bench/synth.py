@@ -0,0 +1,83 @@
+"""makes /move payloads for the replay corpus when there are no recorded
+games to hand, written in the same format RECORD_DIR saves games in
+
+python bench/synth.py
+"""
+import json
+import os
+import random
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+
+def randomGame(seed, width, height, snakes, food, turn=50, hungry=False):
+    """a board with randomly wiggled snakes and food dropped in the gaps,
+    if hungry our snake is low enough on health to weigh up every meal
+    """
+    rand = random.Random(seed)
+    taken = set()
+    allSnakes = []
+    while len(allSnakes) < snakes:
+        x, y = rand.randrange(width), rand.randrange(height)
+        if (x, y) in taken:
+            continue
+        body = [(x, y)]
+        length = rand.randint(3, 3+turn//10)
+        while len(body) < length:
+            cx, cy = body[-1]
+            options = [(cx+dx, cy+dy) for dx, dy in ((1, 0), (-1, 0), (0, 1), (0, -1))
+                if 0 <= cx+dx < width and 0 <= cy+dy < height
+                and (cx+dx, cy+dy) not in taken and (cx+dx, cy+dy) not in body]
+            if not options:
+                break
+            body.append(rand.choice(options))
+        if len(body) < 3:
+            continue
+        taken.update(body)
+        allSnakes.append(makeSnake("snake-%d" % len(allSnakes), rand.randint(30, 100), body))
+
+    meals = []
+    while len(meals) < food:
+        x, y = rand.randrange(width), rand.randrange(height)
+        if (x, y) not in taken:
+            taken.add((x, y))
+            meals.append({"x": x, "y": y})
+    if hungry:
+        allSnakes[0]["health"] = len(allSnakes[0]["body"]) + 2
+    return makePayload("synth-%d" % seed, turn, width, height, meals, allSnakes)
+
+def stallGame():
+    """our snake walls itself into a pocket away from its own tail,
+    with no food or enemies reachable so only stallForTime is left
+    """
+    width = height = 19
+    wall = [(9, y) for y in range(18, -1, -1)] + [(x, 0) for x in range(8, -1, -1)]
+    enemy = makeSnake("enemy", 90, wall)
+    body = [(0, 4)] + [(x, 5) for x in range(9)] + [(8, y) for y in range(6, 9)]
+    us = makeSnake("me", 90, body)
+    meals = [{"x": 15, "y": 15}, {"x": 4, "y": 12}]
+    return makePayload("stall", 120, width, height, meals, [us, enemy])
+
+def makeSnake(snakeId, health, body):
+    return {"id": snakeId, "name": snakeId, "health": health,
+        "body": [{"x": x, "y": y} for x, y in body]}
+
+def makePayload(gameId, turn, width, height, food, snakes):
+    return {"game": {"id": gameId}, "turn": turn,
+        "board": {"height": height, "width": width, "food": food, "snakes": snakes},
+        "you": snakes[0]}
+
+CASES = {
+    "small-7x7-2snakes": lambda: randomGame(1, 7, 7, 2, 1, 10),
+    "standard-11x11-4snakes": lambda: randomGame(2, 11, 11, 4, 5),
+    "large-19x19-8snakes": lambda: randomGame(3, 19, 19, 8, 10, 120),
+    "multifood-19x19-30food": lambda: randomGame(4, 19, 19, 4, 30, 80, hungry=True),
+    "solo-19x19-12food": lambda: randomGame(5, 19, 19, 1, 12, 60),
+    "huge-25x25-8snakes": lambda: randomGame(6, 25, 25, 8, 20, 150),
+    "stall-19x19": stallGame,
+}
+
+if __name__ == '__main__':
+    for name, make in sorted(CASES.items()):
+        with open(os.path.join(CORPUS, name + ".json"), "w") as f:
+            json.dump(make(), f)
+        print("wrote", name)